@@ -3,6 +3,10 @@ from flask import Flask
 from routes.auth_routes import auth_bp
 from routes.upload_routes import upload_bp
 from routes.podcast_routes import podcast_bp
+from routes.job_routes import job_bp
+from services.job_service import init_db
+from services.dedupe_service import init_db as init_dedupe_db
+from services.storage_service import init_db as init_storage_db
 from flask_login import LoginManager
 import os
 
@@ -13,6 +17,12 @@ app.secret_key = os.getenv("SECRET_KEY", "your-dev-secret")
 app.register_blueprint(auth_bp)
 app.register_blueprint(upload_bp)
 app.register_blueprint(podcast_bp)
+app.register_blueprint(job_bp)
+
+# Job queue tables live in instance/users.db next to the app data
+init_db()
+init_dedupe_db()
+init_storage_db()
 
 # Login setup
 login_manager = LoginManager()
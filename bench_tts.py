@@ -0,0 +1,91 @@
+# Benchmark XTTS float32 against the int8 inference mode on this machine:
+#   python bench_tts.py [--threads N] [--runs N] [--voice path.wav]
+#
+# Reports the real-time factor (synthesis time / audio duration, lower is better)
+# of each mode and exits non-zero if the int8 output regresses against float.
+import argparse
+import logging
+import time
+
+import numpy as np
+import torch
+
+from config import DEFAULT_VOICES, TTS_THREADS_PER_PROCESS
+from services.tts_engine import XttsEngine
+
+SENTENCES = [
+    "Welcome back to the show, today we are talking about how cells turn food into energy.",
+    "The mitochondria take glucose and oxygen and produce the ATP that powers almost everything a cell does.",
+    "That is a lot to take in, so let's slow down and go through it one step at a time.",
+]
+
+# Thresholds for the quality check against the float model
+MIN_SPECTRAL_SIMILARITY = 0.95
+MAX_DURATION_DRIFT = 0.25
+
+def long_term_spectrum(wav, sample_rate):
+    # Average log-magnitude spectrum: a cheap, sampling-independent proxy for
+    # timbre, since two sampled renditions of a sentence never align sample by sample
+    frames = torch.stft(torch.from_numpy(wav), n_fft=1024, hop_length=256, return_complex=True).abs()
+    return torch.log1p(frames).mean(dim=1).numpy()
+
+def run(engine, voice, runs):
+    outputs, seconds, duration = [], 0.0, 0.0
+    for i in range(runs):
+        for j, text in enumerate(SENTENCES):
+            torch.manual_seed(i * len(SENTENCES) + j)
+            started = time.perf_counter()
+            wav = engine.synthesize(text, voice)
+            seconds += time.perf_counter() - started
+            duration += len(wav) / engine.sample_rate
+            outputs.append(wav)
+    return outputs, seconds / duration
+
+def compare(reference, candidate, sample_rate):
+    failures = []
+    for i, (ref, cand) in enumerate(zip(reference, candidate)):
+        if not np.isfinite(cand).all():
+            failures.append(f"clip {i}: non-finite samples")
+            continue
+        a, b = long_term_spectrum(ref, sample_rate), long_term_spectrum(cand, sample_rate)
+        similarity = float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+        drift = abs(len(cand) - len(ref)) / len(ref)
+        print(f"  clip {i}: spectral similarity {similarity:.3f}, duration drift {drift:.0%}")
+        if similarity < MIN_SPECTRAL_SIMILARITY:
+            failures.append(f"clip {i}: spectral similarity {similarity:.3f} < {MIN_SPECTRAL_SIMILARITY}")
+        if drift > MAX_DURATION_DRIFT:
+            failures.append(f"clip {i}: duration drift {drift:.0%} > {MAX_DURATION_DRIFT:.0%}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="XTTS float32 vs int8 benchmark")
+    parser.add_argument("--threads", type=int, default=TTS_THREADS_PER_PROCESS)
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--voice", default=DEFAULT_VOICES[0])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    torch.set_num_threads(args.threads)
+    engine = XttsEngine(quantize="")
+    engine.load()
+    engine.warm_up()
+
+    float_outputs, float_rtf = run(engine, args.voice, args.runs)
+    engine.quantize_int8()
+    engine.warm_up()
+    int8_outputs, int8_rtf = run(engine, args.voice, args.runs)
+
+    print(f"threads: {args.threads}")
+    print(f"float32 RTF: {float_rtf:.2f}")
+    print(f"int8    RTF: {int8_rtf:.2f} ({float_rtf / int8_rtf:.2f}x faster)")
+    print("quality vs float32:")
+    failures = compare(float_outputs, int8_outputs, engine.sample_rate)
+    if failures:
+        print("FAIL")
+        for failure in failures:
+            print(f"  {failure}")
+        raise SystemExit(1)
+    print("OK")
+
+if __name__ == '__main__':
+    main()
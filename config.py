@@ -0,0 +1,138 @@
+import json
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INSTANCE_DIR = os.path.join(BASE_DIR, "instance")
+
+# SQLite file shared by the web app and the job workers
+DATABASE_PATH = os.getenv("DATABASE_PATH", os.path.join(INSTANCE_DIR, "users.db"))
+
+# Job queue
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# OCR
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_PARALLEL = os.getenv("OCR_PARALLEL", "1") == "1"
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+# Pages rasterized per task; bounds how many page images are in memory per process
+OCR_PAGES_PER_TASK = int(os.getenv("OCR_PAGES_PER_TASK", "4"))
+# Use the PDF's embedded text where a page has at least this many letters/digits
+OCR_TEXT_LAYER = os.getenv("OCR_TEXT_LAYER", "1") == "1"
+OCR_TEXT_LAYER_MIN_CHARS = int(os.getenv("OCR_TEXT_LAYER_MIN_CHARS", "40"))
+# Content-addressed cache of OCR output, keyed by rendered page hash
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join(INSTANCE_DIR, "cache", "ocr"))
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Page preprocessing before Tesseract
+OCR_MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", str(2480 * 3508)))  # A4 at 300 DPI
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "1") == "1"
+OCR_BLANK_INK_RATIO = float(os.getenv("OCR_BLANK_INK_RATIO", "0.001"))
+# Pixels at least this much darker than the page background count as ink
+OCR_INK_CONTRAST = int(os.getenv("OCR_INK_CONTRAST", "64"))
+
+DEFAULT_HOSTS = ("Jordan", "Taylor")
+
+# LLM
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3")
+# Models to route between, most capable first. A model is used while the number of
+# queued jobs is at most its max_queue and the input is at most its max_input_tokens
+# (either may be omitted); the last model is the fallback. Pull them all in Ollama.
+# Only LLM_MODEL by default; to shed load, opt in with e.g.
+# LLM_MODELS='[{"name": "llama3", "max_queue": 4}, {"name": "llama3.2"}]'
+LLM_MODELS = json.loads(os.getenv("LLM_MODELS", json.dumps([{"name": LLM_MODEL}])))
+# How long Ollama keeps a model loaded after each request ("-1m" keeps it loaded indefinitely)
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")
+# Longest pause allowed between streamed pieces of a reply
+LLM_READ_TIMEOUT = int(os.getenv("LLM_READ_TIMEOUT", "300"))
+# Documents longer than this are pre-summarized extractively before prompting
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "16000"))
+# Long documents are split into chunks of this many tokens and scripted concurrently;
+# llama3 has an 8k context and the prompt and reply need room too
+LLM_CHUNK_TOKENS = int(os.getenv("LLM_CHUNK_TOKENS", "3000"))
+# Requests in flight per job; Ollama must allow it too (OLLAMA_NUM_PARALLEL)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+# Tokenizer used for counting; a local tokenizer.json wins over a hub name
+TOKENIZER_PATH = os.getenv("TOKENIZER_PATH", os.path.join(INSTANCE_DIR, "tokenizer.json"))
+TOKENIZER_NAME = os.getenv("TOKENIZER_NAME", "gpt2")
+# Finished scripts keyed by input text, model, prompt template and host names
+SCRIPT_CACHE_DIR = os.getenv("SCRIPT_CACHE_DIR", os.path.join(INSTANCE_DIR, "cache", "scripts"))
+SCRIPT_CACHE_MAX_BYTES = int(os.getenv("SCRIPT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SCRIPT_CACHE_TTL = int(os.getenv("SCRIPT_CACHE_TTL", str(30 * 24 * 3600)))
+
+# Near-duplicate documents (MinHash estimate of shingle Jaccard) reuse earlier results
+DEDUPE_THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0.85"))
+
+# Text to speech
+VOICES_DIR = os.getenv("VOICES_DIR", os.path.join(BASE_DIR, "voices"))
+DEFAULT_VOICES = (os.path.join(VOICES_DIR, "jordan.wav"), os.path.join(VOICES_DIR, "taylor.wav"))
+TTS_MODEL_DIR = os.getenv("TTS_MODEL_DIR", os.path.join(BASE_DIR, "models", "xtts_v1"))
+TTS_LANGUAGE = os.getenv("TTS_LANGUAGE", "en")
+# synth_server.py listens here; every job worker on the node shares its one model copy
+TTS_SOCKET = os.getenv("TTS_SOCKET", os.path.join(INSTANCE_DIR, "tts.sock"))
+TTS_AUTHKEY = os.getenv("TTS_AUTHKEY", "unipod-tts").encode()
+# XTTS accepts at most 400 text tokens per call; longer turns are split at sentences,
+# and longer sentences at commas or spaces
+TTS_MAX_CHARS = int(os.getenv("TTS_MAX_CHARS", "250"))
+# Silence between turns; a negative gap overlaps adjacent turns instead
+TTS_TURN_GAP_MS = int(os.getenv("TTS_TURN_GAP_MS", "300"))
+# Turn edges are ramped over this long (or the overlap) so they never click
+TTS_FADE_MS = int(os.getenv("TTS_FADE_MS", "10"))
+# Uploaded host voices and every voice's cached XTTS conditioning latents, per user
+VOICE_STORE_DIR = os.getenv("VOICE_STORE_DIR", os.path.join(INSTANCE_DIR, "voices"))
+# Reference audio is normalized to this rate (XTTS's output rate) when uploaded
+TTS_SAMPLE_RATE = int(os.getenv("TTS_SAMPLE_RATE", "24000"))
+# synth_server.py forks this many synthesis processes after loading the model once;
+# they share its weights copy-on-write and split the cores between them
+TTS_PROCESSES = int(os.getenv("TTS_PROCESSES", str(max(1, (os.cpu_count() or 1) // 4))))
+TTS_THREADS_PER_PROCESS = int(os.getenv(
+    "TTS_THREADS_PER_PROCESS", str(max(1, (os.cpu_count() or 1) // TTS_PROCESSES)),
+))
+# Pieces of text each job has in flight at the synthesis server
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", str(TTS_PROCESSES)))
+# Adjacent sentences are packed into one synthesis call until it reaches this length
+TTS_PACK_CHARS = int(os.getenv("TTS_PACK_CHARS", "100"))
+# Synthesized clips keyed by normalized text, voice and model version
+TTS_MODEL_VERSION = os.getenv("TTS_MODEL_VERSION", "xtts_v1")
+CLIP_CACHE_DIR = os.getenv("CLIP_CACHE_DIR", os.path.join(INSTANCE_DIR, "cache", "clips"))
+CLIP_CACHE_MAX_BYTES = int(os.getenv("CLIP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Opt-in CPU inference mode: "int8" applies dynamic int8 quantization to the linear layers
+TTS_QUANTIZE = os.getenv("TTS_QUANTIZE", "")
+# Episode renditions, all encoded from the same PCM in one ffmpeg run. Listed
+# cheapest first: players take the first one the browser can play
+AUDIO_RENDITIONS = json.loads(os.getenv("AUDIO_RENDITIONS", json.dumps([
+    {"name": "opus", "codec": "libopus", "bitrate": "32k", "format": "ogg", "extension": "ogg",
+     "mimetype": "audio/ogg; codecs=opus"},
+    {"name": "mp3", "codec": "libmp3lame", "bitrate": "128k", "format": "mp3", "extension": "mp3",
+     "mimetype": "audio/mpeg"},
+])))
+# Each running job gets a private directory here. Finished episodes stay in it,
+# and are served from it, until their background upload completes
+SCRATCH_DIR = os.getenv("SCRATCH_DIR", os.path.join(INSTANCE_DIR, "scratch"))
+
+# Where finished episodes are stored: "s3" (the AWS_BUCKET bucket) or "local"
+# (LOCAL_STORAGE_DIR, for test and on-prem setups without S3)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", os.path.join(INSTANCE_DIR, "storage"))
+# S3 uploads: files above the threshold go up in parts, this many at a time
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))
+S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE", str(8 * 1024 * 1024)))
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "8"))
+# Each worker process runs one background uploader that polls this often
+UPLOAD_POLL_INTERVAL = float(os.getenv("UPLOAD_POLL_INTERVAL", "1.0"))
+UPLOAD_LEASE_SECONDS = int(os.getenv("UPLOAD_LEASE_SECONDS", "600"))
+UPLOAD_MAX_ATTEMPTS = int(os.getenv("UPLOAD_MAX_ATTEMPTS", "5"))
+# Failed uploads are retried after this many seconds, doubling each attempt
+UPLOAD_RETRY_DELAY = float(os.getenv("UPLOAD_RETRY_DELAY", "5"))
+# Files of uploads that gave up are kept this long for a retry, then deleted
+UPLOAD_FAILED_RETENTION = int(os.getenv("UPLOAD_FAILED_RETENTION", str(7 * 24 * 3600)))
+
+# Progressive playback: per-job MP3 chunks served while the episode is synthesized
+STREAM_DIR = os.getenv("STREAM_DIR", os.path.join(INSTANCE_DIR, "streams"))
+STREAM_BITRATE = os.getenv("STREAM_BITRATE", "64k")
+# A listener gives up when no new chunk has appeared for this long
+STREAM_IDLE_TIMEOUT = int(os.getenv("STREAM_IDLE_TIMEOUT", "300"))
+# Finished streams are deleted after this long
+STREAM_RETENTION = int(os.getenv("STREAM_RETENTION", "3600"))
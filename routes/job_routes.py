@@ -0,0 +1,84 @@
+from flask import Blueprint, Response, jsonify, abort, redirect, send_file, stream_with_context
+from flask_login import login_required, current_user
+from services.job_service import get_job, requeue_job, set_result
+from services.storage_service import local_file, storage_for, retry_uploads
+from services.stream_service import has_stream, stream_chunks
+
+job_bp = Blueprint('job_bp', __name__)
+
+@job_bp.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None or job["user_id"] != str(current_user.id):
+        abort(404)
+    return jsonify(
+        id=job["id"],
+        status=job["status"],
+        stage=job["stage"],
+        attempts=job["attempts"],
+        error=job["error"],
+        result=job["result"],
+    )
+
+@job_bp.route('/jobs/<int:job_id>/stream')
+@login_required
+def job_stream(job_id):
+    """Play the episode while it is being synthesized, as one progressive MP3.
+
+    A listener holds its web worker for the whole episode, so serve the app
+    with a threaded or async worker class (e.g. gunicorn --threads or gevent).
+    Returns 204 while the job has not started its stream yet (poll again) and
+    404 once it can no longer stream, e.g. reused audio from a similar document.
+    """
+    job = get_job(job_id)
+    if job is None or job["user_id"] != str(current_user.id):
+        abort(404)
+    if not has_stream(job_id):
+        if job["status"] in ("queued", "running"):
+            return "", 204
+        abort(404)
+    return Response(stream_with_context(stream_chunks(job_id)), mimetype="audio/mpeg")
+
+@job_bp.route('/jobs/<int:job_id>/audio/<name>')
+@login_required
+def job_audio(job_id, name):
+    """Play a finished episode rendition: from local scratch until its upload is done, then from storage."""
+    job = get_job(job_id)
+    if job is None or job["user_id"] != str(current_user.id):
+        abort(404)
+    renditions = (job["result"] or {}).get("renditions", [])
+    rendition = next((r for r in renditions if r.get("name") == name), None)
+    if rendition is None:
+        abort(404)
+    if rendition["url"]:
+        storage = storage_for(rendition["url"])
+        path = storage.local_path(rendition["url"])
+        if path is not None:
+            return send_file(path, mimetype=rendition["mimetype"], conditional=True)
+        return redirect(storage.download_url(rendition["url"]))
+    path = local_file(job_id, name)
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype=rendition["mimetype"], conditional=True)
+
+@job_bp.route('/jobs/<int:job_id>/retry', methods=['POST'])
+@login_required
+def retry_job(job_id):
+    job = get_job(job_id)
+    if job is None or job["user_id"] != str(current_user.id):
+        abort(404)
+    result = job["result"] or {}
+    if job["status"] == "done" and result.get("upload") == "failed":
+        # The episode is done but did not reach storage: upload it again, or, once
+        # its scratch files are gone (see cleanup_failed_uploads), render it again
+        result.pop("upload_error", None)
+        set_result(job_id, {**result, "upload": "pending"})
+        if retry_uploads(job_id):
+            return jsonify(id=job_id, status="done", upload="pending"), 202
+        requeue_job(job_id, job["result"].get("upload_error"))
+        return jsonify(id=job_id, status="queued"), 202
+    if job["status"] != "failed":
+        return jsonify(error="only failed jobs can be retried"), 409
+    requeue_job(job_id, job["error"])
+    return jsonify(id=job_id, status="queued"), 202
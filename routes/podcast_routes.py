@@ -1,10 +1,32 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
 from flask import Blueprint, render_template
 from flask_login import login_required, current_user
+from services.job_service import list_jobs, load_checkpoint
 
 podcast_bp = Blueprint('podcast_bp', __name__)
 
+@podcast_bp.app_template_filter('format_uk_time')
+def format_uk_time(timestamp):
+    return datetime.fromtimestamp(timestamp, ZoneInfo("Europe/London")).strftime("%d %b %Y, %H:%M")
+
+def _podcast(job):
+    result = job["result"] or {}
+    playlist = result.get("playlist") or job["payload"].get("playlist")
+    return {
+        "id": job["id"],
+        "job_id": job["id"],
+        "title": job["payload"].get("title") or f"Podcast #{job['id']}",
+        "created_at": job["created_at"],
+        "playlist": {"name": playlist} if playlist else None,
+        "renditions": result.get("renditions"),
+        "script": load_checkpoint(job["id"], "script"),
+    }
+
 @podcast_bp.route('/my-podcasts')
 @login_required
 def my_podcasts():
-    # Placeholder until DB is hooked up
-    return render_template('my_podcasts.html', podcasts=[])
+    # Every finished job is an episode; its audio is served by job_bp.job_audio
+    podcasts = [_podcast(job) for job in list_jobs(current_user.id, status="done")]
+    return render_template('my_podcasts.html', podcasts=podcasts)
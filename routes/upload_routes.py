@@ -1,21 +1,37 @@
-from flask import Blueprint, render_template, request, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, url_for
 from flask_login import login_required, current_user
-from services.ocr_service import extract_text_from_pdf
-from services.llm_service import generate_script
-from services.audio_service import generate_audio
-from services.s3_service import upload_to_s3
+from services.job_service import enqueue_job
+from services.voice_service import default_voice, save_custom_voice
+from utils.file_utils import generate_unique_filename, get_user_upload_path
 
 upload_bp = Blueprint('upload_bp', __name__)
 
+def _host_voice(custom_field, choice_field, default):
+    # An uploaded clip wins over the dropdown choice
+    custom = request.files.get(custom_field)
+    if custom and custom.filename:
+        return save_custom_voice(custom, current_user.id)
+    return default_voice(request.form.get(choice_field) or default)
+
 @upload_bp.route('/upload', methods=['GET', 'POST'])
 @login_required
 def upload():
     if request.method == 'POST':
         pdf = request.files['pdf']
-        playlist = request.form.get('playlist')
-        text = extract_text_from_pdf(pdf)
-        script = generate_script(text)
-        audio_path = generate_audio(script)
-        s3_url = upload_to_s3(audio_path, current_user.id, playlist)
-        return redirect(url_for('podcast_bp.my_podcasts'))
+        pdf_path = get_user_upload_path(current_user.id, generate_unique_filename(".pdf"))
+        pdf.save(pdf_path)
+        # The pipeline runs in worker.py; hand back a job id the client can poll
+        job_id = enqueue_job(current_user.id, {
+            "pdf_path": pdf_path,
+            # The document's name, shown in My Podcasts
+            "title": pdf.filename.rsplit(".", 1)[0] if pdf.filename else None,
+            "playlist": request.form.get('playlist'),
+            "hosts": [request.form.get('host1_name') or "Jordan", request.form.get('host2_name') or "Taylor"],
+            "voices": [
+                _host_voice('jordan_custom_wav', 'jordan_voice', "jordan.wav"),
+                _host_voice('taylor_custom_wav', 'taylor_voice', "taylor.wav"),
+            ],
+            "fresh": bool(request.form.get('fresh')),
+        })
+        return jsonify(job_id=job_id, status_url=url_for('job_bp.job_status', job_id=job_id)), 202
     return render_template('upload.html')
@@ -1,11 +1,264 @@
-from pydub import AudioSegment
+import logging
 import os
+import queue
+import re
+import struct
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client
 
-def generate_audio(script, speaker1="voices/jordan.wav", speaker2="voices/taylor.wav"):
-    print("⚠️ XTTS voice generation not implemented yet. Using silent placeholder audio.")
+import numpy as np
 
-    # Generate 3-second silent audio file for testing
-    silence = AudioSegment.silent(duration=3000)
-    output_path = "final_podcast.mp3"
-    silence.export(output_path, format="mp3")
-    return output_path
+from config import (
+    DEFAULT_HOSTS, DEFAULT_VOICES, TTS_SOCKET, TTS_AUTHKEY, TTS_MAX_CHARS, TTS_PACK_CHARS, TTS_TURN_GAP_MS,
+    TTS_FADE_MS, TTS_SAMPLE_RATE, TTS_CONCURRENCY, TTS_MODEL_VERSION, TTS_QUANTIZE,
+    CLIP_CACHE_DIR, CLIP_CACHE_MAX_BYTES, AUDIO_RENDITIONS,
+)
+from services.voice_service import resolve_voice
+from utils.disk_cache import DiskCache
+from utils.script_utils import parse_turns
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+CLAUSE_END_RE = re.compile(r"(?<=[,;:])\s+")
+WHITESPACE_RE = re.compile(r"\s+")
+
+_local = threading.local()
+_clip_cache = None
+_clip_cache_lock = threading.Lock()
+
+def _connection():
+    # One connection to synth_server.py per thread, opened on first use
+    if getattr(_local, "conn", None) is None:
+        _local.conn = Client(TTS_SOCKET, family="AF_UNIX", authkey=TTS_AUTHKEY)
+    return _local.conn
+
+def _get_clip_cache():
+    global _clip_cache
+    with _clip_cache_lock:
+        if _clip_cache is None:
+            _clip_cache = DiskCache(CLIP_CACHE_DIR, CLIP_CACHE_MAX_BYTES)
+    return _clip_cache
+
+def _clip_key(text, voice):
+    # XTTS lowercases its input, so case never changes the audio
+    normalized = " ".join(text.lower().split())
+    # Quantized and float models do not produce the same audio
+    model = f"{TTS_MODEL_VERSION}-{TTS_QUANTIZE}" if TTS_QUANTIZE else TTS_MODEL_VERSION
+    return f"{model}|{voice['owner']}/{voice['hash']}|{normalized}"
+
+def synthesize_cached(text, voice):
+    """synthesize(), but recurring phrases (greetings, sign-offs) come from the clip cache."""
+    cache = _get_clip_cache()
+    key = _clip_key(text, voice)
+    cached = cache.get(key)
+    if cached is not None:
+        (sample_rate,) = struct.unpack_from("<I", cached)
+        return np.frombuffer(cached, dtype=np.float32, offset=4), sample_rate
+    wav, sample_rate = synthesize(text, voice)
+    cache.set(key, struct.pack("<I", sample_rate) + np.asarray(wav, dtype=np.float32).tobytes())
+    return wav, sample_rate
+
+def synthesize(text, voice):
+    """Speak `text` in `voice` (see voice_service); returns (float32 samples, sample rate)."""
+    try:
+        conn = _connection()
+        conn.send({"text": text, "voice": voice})
+        response = conn.recv()
+    except (EOFError, OSError):
+        # The server restarted; drop the stale connection so the next call reconnects
+        _local.conn = None
+        raise
+    if "error" in response:
+        raise RuntimeError(f"speech synthesis failed: {response['error']}")
+    return response["wav"], response["sample_rate"]
+
+def _limit_length(text, separator_re):
+    # Greedily rejoin the parts split at `separator_re` into runs of at most TTS_MAX_CHARS
+    runs, current = [], ""
+    for part in separator_re.split(text):
+        if current and len(current) + len(part) + 1 > TTS_MAX_CHARS:
+            runs.append(current)
+            current = ""
+        current = f"{current} {part}".strip()
+    if current:
+        runs.append(current)
+    return runs
+
+def _sentences(text):
+    # XTTS rejects text over its limit, so run-on sentences are split at clause
+    # punctuation, then at spaces, and a single overlong word is cut
+    for sentence in SENTENCE_END_RE.split(text):
+        if len(sentence) <= TTS_MAX_CHARS:
+            yield sentence
+            continue
+        for clause in _limit_length(sentence, CLAUSE_END_RE):
+            for run in _limit_length(clause, WHITESPACE_RE):
+                for start in range(0, len(run), TTS_MAX_CHARS):
+                    yield run[start:start + TTS_MAX_CHARS]
+
+def _split_text(text):
+    """Split a turn into synthesis calls.
+
+    Short adjacent sentences are packed into one call (one forward pass)
+    until it reaches TTS_PACK_CHARS; longer sentences get a call of their
+    own, so they can be synthesized in parallel. A turn's first and last
+    sentences are never packed: greetings and sign-offs recur across
+    episodes, and on their own they hit the clip cache.
+    """
+    sentences = [sentence for sentence in _sentences(text) if sentence.strip()]
+    if len(sentences) <= 2:
+        return sentences
+    pieces, current = [sentences[0]], ""
+    for sentence in sentences[1:-1]:
+        if current and (len(current) >= TTS_PACK_CHARS or len(current) + len(sentence) + 1 > TTS_MAX_CHARS):
+            pieces.append(current)
+            current = ""
+        current = f"{current} {sentence}".strip()
+    if current:
+        pieces.append(current)
+    pieces.append(sentences[-1])
+    return pieces
+
+class EpisodeSynthesizer:
+    """Synthesize speaker turns concurrently and hand them back in order.
+
+    add_turn() queues a turn's pieces on a pool of TTS_CONCURRENCY threads,
+    each with its own connection to the synthesis server. clips() yields
+    one (samples, sample rate) per turn, in script order, as soon as that
+    turn is ready; it ends after finish() has been called. Once clips()
+    has stopped (or cancel() was called), add_turn() drops its turns.
+    """
+
+    _DONE = object()
+
+    def __init__(self, voices, concurrency=TTS_CONCURRENCY):
+        self.voices = voices
+        self._pool = ThreadPoolExecutor(max_workers=concurrency)
+        self._turns = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def add_turn(self, speaker, text):
+        voice = self.voices[speaker]
+        with self._lock:
+            if self._closed:
+                return
+            self._turns.put([self._pool.submit(synthesize_cached, piece, voice) for piece in _split_text(text)])
+
+    def finish(self):
+        self._turns.put(self._DONE)
+
+    def _close(self):
+        with self._lock:
+            self._closed = True
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def cancel(self):
+        # Drop turns that have not started; clips() then fails on the cancelled ones
+        self._close()
+        self._turns.put(self._DONE)
+
+    def clips(self):
+        try:
+            while True:
+                futures = self._turns.get()
+                if futures is self._DONE:
+                    return
+                results = [future.result() for future in futures]
+                if results:
+                    yield np.concatenate([wav for wav, _ in results]), results[0][1]
+        finally:
+            self._close()
+            logger.info("clip cache: %s", _get_clip_cache().stats())
+
+def assemble_episode(clips, sample_rate, gap_ms=TTS_TURN_GAP_MS, fade_ms=TTS_FADE_MS):
+    """Lay turns out on one preallocated timeline and return it as 16-bit PCM.
+
+    Turns are separated by `gap_ms` of silence, or overlap by that much when
+    it is negative. Each turn's edges are ramped over `fade_ms`, or over the
+    overlap, so adjacent turns crossfade instead of clicking. The buffer is
+    sized from the turn lengths up front and written in place, so time and
+    memory grow linearly with the episode.
+    """
+    gap = int(sample_rate * gap_ms / 1000)
+    fade = int(sample_rate * fade_ms / 1000)
+    starts, position = [], 0
+    for wav in clips:
+        starts.append(position)
+        position += max(len(wav) + gap, 0)
+    total = max((start + len(wav) for start, wav in zip(starts, clips)), default=0)
+    # Trailing gap after the last turn, as before
+    timeline = np.zeros(total + max(gap, 0) if clips else 0, dtype=np.float32)
+    for start, wav in zip(starts, clips):
+        n = min(-gap if gap < 0 else fade, len(wav) // 2)
+        if n:
+            # Ramp a copy before mixing, so the fade-in never touches the previous turn's tail
+            wav = wav.copy()
+            # Symmetric ramps: a fade-out and the overlapping fade-in always sum to one
+            ramp = ((np.arange(n) + 0.5) / n).astype(np.float32)
+            wav[:n] *= ramp
+            wav[-n:] *= ramp[::-1]
+        timeline[start:start + len(wav)] += wav
+    np.clip(timeline, -1.0, 1.0, out=timeline)
+    timeline *= 32767
+    return timeline.astype(np.int16)
+
+def episode_synthesizer(speaker1=DEFAULT_VOICES[0], speaker2=DEFAULT_VOICES[1], hosts=DEFAULT_HOSTS):
+    """An EpisodeSynthesizer with one reference voice per host.
+
+    Speakers are voice dicts from voice_service or paths to reference wavs.
+    """
+    return EpisodeSynthesizer({hosts[0]: resolve_voice(speaker1), hosts[1]: resolve_voice(speaker2)})
+
+def encode_renditions(pcm, sample_rate, directory, renditions=AUDIO_RENDITIONS):
+    """Encode 16-bit mono PCM into every rendition with a single ffmpeg run.
+
+    The PCM is piped in and decoded once; each rendition is one output of
+    the same invocation, written straight to `directory` as
+    episode.<extension>. Returns {name: path}.
+    """
+    command = ["ffmpeg", "-y", "-loglevel", "error", "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0"]
+    paths = {}
+    for rendition in renditions:
+        paths[rendition["name"]] = os.path.join(directory, f"episode.{rendition['extension']}")
+        # Bit-exact output (fixed Ogg stream serials, no encoder version tags):
+        # the same episode encodes to the same bytes, so content_key dedupes it
+        command += [
+            "-map", "0:a", "-c:a", rendition["codec"], "-b:a", rendition["bitrate"],
+            "-fflags", "+bitexact", "-flags:a", "+bitexact",
+            "-f", rendition["format"], paths[rendition["name"]],
+        ]
+    result = subprocess.run(command, input=pcm.tobytes(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return paths
+
+def render_episode(synthesizer, directory, on_clip=None):
+    """Assemble the synthesizer's turns into the episode and encode its renditions into `directory`.
+
+    Returns {rendition name: path} (see encode_renditions).
+    `on_clip(samples, sample_rate)` is called with each turn as soon as it
+    is ready, e.g. to feed a progressive stream.
+    """
+    clips = []
+    sample_rate = TTS_SAMPLE_RATE
+    for wav, sample_rate in synthesizer.clips():
+        if on_clip:
+            on_clip(wav, sample_rate)
+        clips.append(np.asarray(wav, dtype=np.float32))
+    if not clips:
+        # E.g. the LLM ignored the 'Name: text' format: fail rather than publish a silent episode
+        raise RuntimeError("the script has no turns to voice")
+    return encode_renditions(assemble_episode(clips, sample_rate), sample_rate, directory)
+
+def generate_audio(script, directory, speaker1=DEFAULT_VOICES[0], speaker2=DEFAULT_VOICES[1], hosts=DEFAULT_HOSTS,
+                   on_clip=None):
+    """Voice a 'Name: text' script with one reference voice per host; see render_episode."""
+    synthesizer = episode_synthesizer(speaker1, speaker2, hosts)
+    for speaker, text in parse_turns(script, hosts):
+        synthesizer.add_turn(speaker, text)
+    synthesizer.finish()
+    return render_episode(synthesizer, directory, on_clip)
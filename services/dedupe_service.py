@@ -0,0 +1,115 @@
+import hashlib
+import re
+import time
+
+import numpy as np
+
+from config import DEDUPE_THRESHOLD
+from utils.db import get_connection, transaction
+
+SHINGLE_WORDS = 5
+# Shorter texts (a failed OCR, a cover page) would match each other trivially
+MIN_WORDS = 50
+NUM_PERM = 128
+# 16 bands of 8 rows: pairs above ~0.7 Jaccard almost always share a bucket
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+PRIME = (1 << 31) - 1
+
+# Fixed seed: signatures are persisted, so the permutations must never change
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, PRIME, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, PRIME, size=NUM_PERM).astype(np.uint64)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doc_signature (
+    job_id INTEGER PRIMARY KEY REFERENCES job (id),
+    variant TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS doc_lsh_bucket (
+    band INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    job_id INTEGER NOT NULL REFERENCES job (id)
+);
+CREATE INDEX IF NOT EXISTS ix_doc_lsh_bucket ON doc_lsh_bucket (band, bucket);
+"""
+
+def init_db():
+    conn = get_connection()
+    try:
+        conn.executescript(SCHEMA)
+    finally:
+        conn.close()
+
+def _shingle_hashes(words):
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles],
+        dtype=np.uint64,
+    )
+
+def minhash(text):
+    """MinHash signature of the text's word 5-gram shingles, or None if it is too short."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+    hashes = _shingle_hashes(words)
+    signature = np.full(NUM_PERM, PRIME, dtype=np.uint64)
+    # Blocks of shingles keep the NUM_PERM x block matrix small on long documents
+    for start in range(0, len(hashes), 8192):
+        block = hashes[start:start + 8192]
+        # a * h stays below 2**63 for 31-bit a and 32-bit h, so uint64 never overflows
+        values = (_A[:, None] * block[None, :] + _B[:, None]) % PRIME
+        signature = np.minimum(signature, values.min(axis=1))
+    return signature.astype(np.uint32)
+
+def _buckets(signature):
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        yield band, hashlib.blake2b(rows, digest_size=8).hexdigest()
+
+def similarity(signature, other):
+    # Share of matching minimums estimates the Jaccard similarity of the shingle sets
+    return float(np.mean(signature == other))
+
+def find_similar(signature, variant, threshold=DEDUPE_THRESHOLD):
+    """Return (job_id, similarity) of the closest indexed document, or None.
+
+    Only documents indexed with the same `variant` (the settings that shape
+    the output, such as host names) and at least `threshold` similar count.
+    """
+    conn = get_connection()
+    try:
+        candidates = set()
+        for band, bucket in _buckets(signature):
+            rows = conn.execute(
+                "SELECT job_id FROM doc_lsh_bucket WHERE band = ? AND bucket = ?", (band, bucket),
+            ).fetchall()
+            candidates.update(row["job_id"] for row in rows)
+        best = None
+        for job_id in candidates:
+            row = conn.execute(
+                "SELECT signature FROM doc_signature WHERE job_id = ? AND variant = ?", (job_id, variant),
+            ).fetchone()
+            if row is None:
+                continue
+            score = similarity(signature, np.frombuffer(row["signature"], dtype=np.uint32))
+            if score >= threshold and (best is None or score > best[1]):
+                best = (job_id, score)
+    finally:
+        conn.close()
+    return best
+
+def index_document(job_id, signature, variant):
+    with transaction() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO doc_signature (job_id, variant, signature, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, variant, signature.tobytes(), time.time()),
+        )
+        conn.execute("DELETE FROM doc_lsh_bucket WHERE job_id = ?", (job_id,))
+        conn.executemany(
+            "INSERT INTO doc_lsh_bucket (band, bucket, job_id) VALUES (?, ?, ?)",
+            [(band, bucket, job_id) for band, bucket in _buckets(signature)],
+        )
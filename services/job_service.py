@@ -0,0 +1,200 @@
+import json
+import time
+
+from config import JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS
+from utils.db import get_connection, transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS job (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    stage TEXT NOT NULL DEFAULT 'queued',
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    locked_by TEXT,
+    locked_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_job_status ON job (status, id);
+CREATE TABLE IF NOT EXISTS job_checkpoint (
+    job_id INTEGER NOT NULL REFERENCES job (id),
+    stage TEXT NOT NULL,
+    output TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+
+def init_db():
+    conn = get_connection()
+    try:
+        conn.executescript(SCHEMA)
+    finally:
+        conn.close()
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+def enqueue_job(user_id, payload):
+    now = time.time()
+    with transaction() as conn:
+        cur = conn.execute(
+            "INSERT INTO job (user_id, payload, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            (str(user_id), json.dumps(payload), now, now),
+        )
+        return cur.lastrowid
+
+def get_job(job_id):
+    conn = get_connection()
+    try:
+        row = conn.execute("SELECT * FROM job WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row)
+
+def list_jobs(user_id, status=None):
+    """A user's jobs, newest first, optionally only those in `status`."""
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            "SELECT * FROM job WHERE user_id = ? AND (? IS NULL OR status = ?) ORDER BY id DESC",
+            (str(user_id), status, status),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [_row_to_job(row) for row in rows]
+
+def count_queued_jobs():
+    conn = get_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM job WHERE status = 'queued'").fetchone()[0]
+    finally:
+        conn.close()
+
+def claim_job(worker_id):
+    """Atomically take the oldest runnable job and lease it to `worker_id`.
+
+    A job whose lease expired (its worker died mid-run) is runnable again,
+    unless it has already used up its attempts.
+    """
+    now = time.time()
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE job SET status = 'failed', error = 'worker lost too many times', updated_at = ? "
+            "WHERE status = 'running' AND locked_until < ? AND attempts >= ?",
+            (now, now, JOB_MAX_ATTEMPTS),
+        )
+        row = conn.execute(
+            "SELECT id FROM job WHERE status = 'queued' "
+            "OR (status = 'running' AND locked_until < ?) ORDER BY id LIMIT 1",
+            (now,),
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE job SET status = 'running', attempts = attempts + 1, locked_by = ?, "
+            "locked_until = ?, updated_at = ? WHERE id = ?",
+            (worker_id, now + JOB_LEASE_SECONDS, now, row["id"]),
+        )
+        row = conn.execute("SELECT * FROM job WHERE id = ?", (row["id"],)).fetchone()
+    return _row_to_job(row)
+
+class LeaseLost(Exception):
+    """The job's lease expired and another worker has claimed it."""
+
+def renew_lease(job_id, worker_id):
+    """Extend `worker_id`'s lease on a running job; False if it no longer holds it."""
+    now = time.time()
+    with transaction() as conn:
+        cur = conn.execute(
+            "UPDATE job SET locked_until = ?, updated_at = ? WHERE id = ? AND status = 'running' AND locked_by = ?",
+            (now + JOB_LEASE_SECONDS, now, job_id, worker_id),
+        )
+        return cur.rowcount > 0
+
+def set_stage(job_id, stage, worker_id):
+    # Moving to a new stage also renews the lease; a worker that lost it stops here
+    now = time.time()
+    with transaction() as conn:
+        cur = conn.execute(
+            "UPDATE job SET stage = ?, locked_until = ?, updated_at = ? "
+            "WHERE id = ? AND status = 'running' AND locked_by = ?",
+            (stage, now + JOB_LEASE_SECONDS, now, job_id, worker_id),
+        )
+        if cur.rowcount == 0:
+            raise LeaseLost(f"job {job_id} is no longer leased to {worker_id}")
+
+# The state changes below only apply while `worker_id` holds the job's lease (locked_by
+# IS NULL for a job no worker holds, e.g. a failed job retried by its owner), so an
+# attempt whose lease expired cannot overwrite the attempt that took over. Each
+# returns whether it applied.
+
+def complete_job(job_id, result, worker_id):
+    with transaction() as conn:
+        cur = conn.execute(
+            "UPDATE job SET status = 'done', stage = 'done', result = ?, error = NULL, "
+            "locked_by = NULL, locked_until = NULL, updated_at = ? WHERE id = ? AND locked_by IS ?",
+            (json.dumps(result), time.time(), job_id, worker_id),
+        )
+        return cur.rowcount > 0
+
+def set_result(job_id, result):
+    # Updates a finished job's result, e.g. once its background upload is done
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE job SET result = ?, updated_at = ? WHERE id = ?", (json.dumps(result), time.time(), job_id),
+        )
+
+def requeue_job(job_id, error, worker_id=None):
+    # Checkpoints are kept, so the next attempt resumes after the last finished stage
+    with transaction() as conn:
+        cur = conn.execute(
+            "UPDATE job SET status = 'queued', error = ?, locked_by = NULL, locked_until = NULL, "
+            "updated_at = ? WHERE id = ? AND locked_by IS ?",
+            (error, time.time(), job_id, worker_id),
+        )
+        return cur.rowcount > 0
+
+def fail_job(job_id, error, worker_id):
+    with transaction() as conn:
+        cur = conn.execute(
+            "UPDATE job SET status = 'failed', error = ?, locked_by = NULL, locked_until = NULL, "
+            "updated_at = ? WHERE id = ? AND locked_by IS ?",
+            (error, time.time(), job_id, worker_id),
+        )
+        return cur.rowcount > 0
+
+def save_checkpoint(job_id, stage, output):
+    with transaction() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO job_checkpoint (job_id, stage, output, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, stage, json.dumps(output), time.time()),
+        )
+
+def load_checkpoint(job_id, stage):
+    """One stage's checkpointed output, or None."""
+    conn = get_connection()
+    try:
+        row = conn.execute(
+            "SELECT output FROM job_checkpoint WHERE job_id = ? AND stage = ?", (job_id, stage),
+        ).fetchone()
+    finally:
+        conn.close()
+    return json.loads(row["output"]) if row else None
+
+def load_checkpoints(job_id):
+    conn = get_connection()
+    try:
+        rows = conn.execute("SELECT stage, output FROM job_checkpoint WHERE job_id = ?", (job_id,)).fetchall()
+    finally:
+        conn.close()
+    return {row["stage"]: json.loads(row["output"]) for row in rows}
@@ -1,12 +1,216 @@
-import requests
+import hashlib
 import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    DEFAULT_HOSTS, OLLAMA_URL, LLM_MODEL, LLM_MODELS, LLM_CHUNK_TOKENS, LLM_CONCURRENCY,
+    LLM_READ_TIMEOUT, LLM_KEEP_ALIVE,
+    SCRIPT_CACHE_DIR, SCRIPT_CACHE_MAX_BYTES, SCRIPT_CACHE_TTL,
+)
+from utils.disk_cache import DiskCache
+from utils.script_utils import TurnParser, format_turns, parse_turns
+from utils.token_utils import chunk_text
+
+logger = logging.getLogger(__name__)
+
+# Identical for every request, so Ollama can reuse the evaluated prefix between
+# calls instead of re-reading the instructions; everything per job goes after it
+SYSTEM_PROMPT = (
+    "You write podcast-style conversations between two hosts about material the user provides. "
+    "Write every line as \"Name: what they say\", alternating naturally between the two hosts, "
+    "with no stage directions or narration."
+)
+
+PROMPT_TEMPLATE = "The hosts are {host1} and {host2}.\n{part}\n\nMaterial:\n{content}"
 
-def generate_script(content):
-    response = requests.post("http://localhost:11434/api/chat", json={
-        "model": "llama3",
+# Segments of a long document are scripted separately and concatenated, so
+# each one is told where it sits in the episode
+PART_INSTRUCTIONS = {
+    "whole": "",
+    "first": "This is the opening part of a longer episode: welcome the listeners and introduce the topic, "
+             "but do not wrap up or say goodbye.",
+    "middle": "This is a middle part of a longer episode that is already under way: do not greet the listeners, "
+              "introduce the hosts or say goodbye; continue the discussion directly.",
+    "last": "This is the final part of a longer episode that is already under way: do not greet the listeners "
+            "or introduce the hosts; finish the discussion and sign off.",
+}
+
+def _part(index, total):
+    if total == 1:
+        return "whole"
+    if index == 0:
+        return "first"
+    return "last" if index == total - 1 else "middle"
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_script_cache = None
+
+def _get_session():
+    # One keep-alive connection pool per process, sized for the concurrent chunk requests.
+    # A forked worker must not reuse the parent's pooled sockets (worker.py warms up
+    # before forking), so it starts a pool of its own
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = requests.Session()
+            _session_pid = os.getpid()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=LLM_CONCURRENCY)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+    return _session
+
+def _stream_chat(prompt, model):
+    """Yield the reply to `prompt` piece by piece as Ollama streams it."""
+    with _get_session().post(f"{OLLAMA_URL}/api/chat", json={
+        "model": model,
         "messages": [
-            {"role": "user", "content": f"Create a podcast-style conversation between Jordan and Taylor about:\n{content}"}
-        ]
-    })
-    result = response.json()
-    return result.get("message", {}).get("content", "")
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        "stream": True,
+        "keep_alive": LLM_KEEP_ALIVE,
+    }, stream=True, timeout=(10, LLM_READ_TIMEOUT)) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                raise RuntimeError(f"Ollama error: {chunk['error']}")
+            yield chunk.get("message", {}).get("content", "")
+            if chunk.get("done"):
+                break
+
+def warm_up(models=None):
+    """Load each model into Ollama and evaluate the shared system prompt.
+
+    Called when a worker starts, so the first job does not pay for loading
+    the model or reading the instructions.
+    """
+    for model in models or [m["name"] for m in LLM_MODELS]:
+        try:
+            _get_session().post(f"{OLLAMA_URL}/api/chat", json={
+                "model": model,
+                "messages": [{"role": "system", "content": SYSTEM_PROMPT}],
+                "stream": False,
+                "keep_alive": LLM_KEEP_ALIVE,
+                "options": {"num_predict": 1},
+            }, timeout=(10, LLM_READ_TIMEOUT)).raise_for_status()
+        except requests.RequestException:
+            logger.warning("could not warm up model %s", model, exc_info=True)
+
+class _OrderedTurns:
+    """Hands turns from concurrently streamed segments to `on_turn` in episode order.
+
+    Turns of the earliest unfinished segment go out as soon as they are
+    parsed; later segments are held back until every segment before them
+    has finished.
+    """
+
+    def __init__(self, count, on_turn):
+        self._lock = threading.Lock()
+        self._pending = [[] for _ in range(count)]
+        self._finished = [False] * count
+        self._next = 0
+        self._on_turn = on_turn
+
+    def add(self, index, turns):
+        with self._lock:
+            self._pending[index].extend(turns)
+            self._release()
+
+    def finish(self, index):
+        with self._lock:
+            self._finished[index] = True
+            self._release()
+
+    def _release(self):
+        while self._next < len(self._pending):
+            for speaker, text in self._pending[self._next]:
+                self._on_turn(speaker, text)
+            self._pending[self._next] = []
+            if not self._finished[self._next]:
+                break
+            self._next += 1
+
+def _get_script_cache():
+    global _script_cache
+    if _script_cache is None:
+        _script_cache = DiskCache(SCRIPT_CACHE_DIR, SCRIPT_CACHE_MAX_BYTES, ttl=SCRIPT_CACHE_TTL)
+    return _script_cache
+
+def _script_cache_key(content, hosts, model):
+    template = hashlib.sha256(json.dumps([SYSTEM_PROMPT, PROMPT_TEMPLATE, PART_INSTRUCTIONS], sort_keys=True).encode()).hexdigest()
+    text = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return json.dumps({"text": text, "model": model, "template": template, "hosts": list(hosts)})
+
+def _generate_segment(prompt, model, index, hosts, ordered):
+    parser = TurnParser(hosts)
+    raw, turns = [], []
+    for piece in _stream_chat(prompt, model):
+        raw.append(piece)
+        new_turns = parser.feed(piece)
+        turns.extend(new_turns)
+        ordered.add(index, new_turns)
+    last_turns = parser.close()
+    turns.extend(last_turns)
+    ordered.add(index, last_turns)
+    ordered.finish(index)
+    return turns, "".join(raw)
+
+def generate_script(content, hosts=DEFAULT_HOSTS, on_turn=None, use_cache=True, model=LLM_MODEL):
+    """Write a two-host podcast script about `content`.
+
+    Long content is split into token-counted chunks that are scripted
+    concurrently (map), then joined in order into one conversation (reduce).
+    Replies are streamed, and if `on_turn(speaker, text)` is given it is
+    called for each speaker turn, in order, as soon as the turn is complete.
+
+    `model` is the Ollama model to use. Scripts are cached by content,
+    model, prompt template and host names; `use_cache=False` skips the
+    lookup and replaces the cached script.
+    """
+    cache = _get_script_cache()
+    key = _script_cache_key(content, hosts, model)
+    cached = cache.get(key) if use_cache else None
+    if cached is not None:
+        script = cached.decode("utf-8")
+        logger.info("script cache hit (%s)", cache.stats())
+        if on_turn:
+            for speaker, text in parse_turns(script, hosts):
+                on_turn(speaker, text)
+        return script
+    script = _generate_script(content, hosts, on_turn, model)
+    # A script without turns cannot be voiced; a retry should ask the model again
+    if parse_turns(script, hosts):
+        cache.set(key, script.encode("utf-8"))
+    return script
+
+def _generate_script(content, hosts, on_turn, model):
+    chunks = chunk_text(content, LLM_CHUNK_TOKENS) or [content]
+    prompts = [
+        PROMPT_TEMPLATE.format(
+            host1=hosts[0], host2=hosts[1], part=PART_INSTRUCTIONS[_part(i, len(chunks))], content=chunk,
+        )
+        for i, chunk in enumerate(chunks)
+    ]
+    ordered = _OrderedTurns(len(prompts), on_turn or (lambda speaker, text: None))
+    if len(prompts) > 1:
+        logger.info("scripting %d chunks, %d at a time", len(prompts), LLM_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=LLM_CONCURRENCY) as pool:
+        segments = list(pool.map(
+            lambda i: _generate_segment(prompts[i], model, i, hosts, ordered), range(len(prompts)),
+        ))
+    turns = [turn for segment_turns, _ in segments for turn in segment_turns]
+    if not turns:
+        # The model ignored the "Name: line" format; keep whatever it wrote
+        return "\n\n".join(raw.strip() for _, raw in segments)
+    return format_turns(turns)
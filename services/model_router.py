@@ -0,0 +1,19 @@
+import logging
+
+from config import LLM_MODELS
+from services.job_service import count_queued_jobs
+from utils.token_utils import count_tokens
+
+logger = logging.getLogger(__name__)
+
+def choose_model(text):
+    """Pick the most capable configured model the input size and backlog allow."""
+    input_tokens = count_tokens(text)
+    queued = count_queued_jobs()
+    for model in LLM_MODELS[:-1]:
+        if queued <= model.get("max_queue", queued) and input_tokens <= model.get("max_input_tokens", input_tokens):
+            break
+    else:
+        model = LLM_MODELS[-1]
+    logger.info("routing %d tokens with %d jobs queued to %s", input_tokens, queued, model["name"])
+    return model["name"]
@@ -0,0 +1,67 @@
+from PIL import ImageOps
+
+from config import OCR_MAX_PIXELS, OCR_BINARIZE, OCR_BLANK_INK_RATIO, OCR_INK_CONTRAST
+
+def _otsu_threshold(histogram):
+    total = sum(histogram)
+    weighted_sum = sum(i * count for i, count in enumerate(histogram))
+    background = background_sum = 0
+    best_threshold, best_variance = 127, 0.0
+    for i, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        background_sum += i * count
+        mean_bg = background_sum / background
+        mean_fg = (weighted_sum - background_sum) / foreground
+        variance = background * foreground * (mean_bg - mean_fg) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = i, variance
+    return best_threshold
+
+def _background(histogram):
+    # Most of a page is paper, so the median gray level is the paper's
+    half, seen = sum(histogram) / 2, 0
+    for level, count in enumerate(histogram):
+        seen += count
+        if seen >= half:
+            return level
+    return 255
+
+def _downscale(image):
+    # Large-format or high-DPI renders are shrunk to a fixed pixel budget;
+    # Tesseract time grows with pixel count, accuracy barely does past ~300 DPI
+    pixels = image.width * image.height
+    if pixels <= OCR_MAX_PIXELS:
+        return image
+    scale = (OCR_MAX_PIXELS / pixels) ** 0.5
+    return image.resize((int(image.width * scale), int(image.height * scale)))
+
+def preprocess_page(image):
+    """Prepare a rendered page for Tesseract.
+
+    Returns a smaller, grayscale (optionally binarized) image, or None when
+    the page is blank or nearly so and OCR can be skipped.
+    """
+    gray = _downscale(ImageOps.grayscale(image))
+    histogram = gray.histogram()
+    # Ink is measured against the background, not the Otsu threshold: Otsu splits
+    # even a blank scan's paper noise in two, making half the page "ink"
+    ink_level = _background(histogram) - OCR_INK_CONTRAST
+    ink = sum(histogram[:max(ink_level, 0)])
+    # Pages with a handful of dark pixels (specks, a lone page number) are blank
+    if ink / (gray.width * gray.height) < OCR_BLANK_INK_RATIO:
+        return None
+    if OCR_BINARIZE:
+        threshold = _otsu_threshold(histogram)
+        return gray.point(lambda value: 255 if value > threshold else 0, mode="1")
+    return gray
+
+def preprocess_settings():
+    return (
+        f"max_pixels={OCR_MAX_PIXELS};binarize={OCR_BINARIZE};blank={OCR_BLANK_INK_RATIO};"
+        f"ink_contrast={OCR_INK_CONTRAST}"
+    )
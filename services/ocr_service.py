@@ -1,9 +1,178 @@
-from pdf2image import convert_from_bytes
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from pdf2image import convert_from_path, pdfinfo_from_path
 import pytesseract
 
-def extract_text_from_pdf(file):
-    images = convert_from_bytes(file.read())
-    text = ""
-    for img in images:
-        text += pytesseract.image_to_string(img)
+from config import (
+    OCR_DPI, OCR_PARALLEL, OCR_WORKERS, OCR_PAGES_PER_TASK, OCR_TEXT_LAYER, OCR_TEXT_LAYER_MIN_CHARS,
+    OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES,
+)
+from services.ocr_preprocess import preprocess_page, preprocess_settings
+from utils.disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+# Running totals for this process, across all documents
+ocr_cache_stats = {"hits": 0, "misses": 0}
+
+# Created lazily so each pool process opens its own handle
+_cache = None
+_settings_key = None
+
+def _get_cache():
+    global _cache
+    if _cache is None:
+        _cache = DiskCache(OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES)
+    return _cache
+
+def _ocr_settings():
+    # Anything that changes Tesseract's output for the same pixels goes in the key
+    global _settings_key
+    if _settings_key is None:
+        _settings_key = f"tesseract={pytesseract.get_tesseract_version()};dpi={OCR_DPI};{preprocess_settings()}"
+    return _settings_key
+
+def _page_key(image):
+    digest = hashlib.sha256(image.tobytes())
+    digest.update(f"{image.mode};{image.size}".encode())
+    return f"{digest.hexdigest()};{_ocr_settings()}"
+
+def _new_stats():
+    return {"hits": 0, "misses": 0, "blank": 0, "text_layer": 0, "timings": []}
+
+def _ocr_image(image, page, stats):
+    started = time.perf_counter()
+    image = preprocess_page(image)
+    if image is None:
+        stats["blank"] += 1
+        text, source = "", "blank"
+    else:
+        cache = _get_cache()
+        key = _page_key(image)
+        cached = cache.get(key)
+        if cached is not None:
+            stats["hits"] += 1
+            text, source = cached.decode("utf-8"), "cache"
+        else:
+            stats["misses"] += 1
+            text, source = pytesseract.image_to_string(image), "ocr"
+            cache.set(key, text.encode("utf-8"))
+    stats["timings"].append((page, source, time.perf_counter() - started))
     return text
+
+def _init_ocr_process():
+    # One tesseract thread per process; the pool provides the parallelism
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+def _text_layer(pdf_path, first_page, last_page):
+    """Embedded text of each page in the range, via poppler's pdftotext.
+
+    Poppler is already required by pdf2image. Pages come back empty when
+    the PDF has no text layer or pdftotext is unavailable.
+    """
+    count = last_page - first_page + 1
+    try:
+        out = subprocess.run(
+            ["pdftotext", "-f", str(first_page), "-l", str(last_page), "-enc", "UTF-8", pdf_path, "-"],
+            capture_output=True, check=True,
+        ).stdout.decode("utf-8", "replace")
+    except (OSError, subprocess.CalledProcessError):
+        return [""] * count
+    # pdftotext ends every page with a form feed
+    pages = out.split("\f")[:count]
+    return pages + [""] * (count - len(pages))
+
+def _has_usable_text(text):
+    visible = [c for c in text if not c.isspace()]
+    letters = sum(c.isalnum() for c in visible)
+    # Broken font encodings produce text layers that are mostly symbols
+    return letters >= OCR_TEXT_LAYER_MIN_CHARS and letters >= len(visible) / 2
+
+def _ocr_page(pdf_path, page, stats):
+    image = convert_from_path(pdf_path, dpi=OCR_DPI, first_page=page, last_page=page)[0]
+    return _ocr_image(image, page, stats)
+
+def _ocr_page_range(pdf_path, first_page, last_page):
+    """OCR one page range; returns the page texts and the range's stats."""
+    stats = _new_stats()
+    if not OCR_TEXT_LAYER:
+        images = convert_from_path(pdf_path, dpi=OCR_DPI, first_page=first_page, last_page=last_page)
+        return [_ocr_image(img, first_page + i, stats) for i, img in enumerate(images)], stats
+    pages = _text_layer(pdf_path, first_page, last_page)
+    for offset, text in enumerate(pages):
+        # Only scanned pages (no usable text layer) go through Tesseract
+        if _has_usable_text(text):
+            stats["text_layer"] += 1
+        else:
+            pages[offset] = _ocr_page(pdf_path, first_page + offset, stats)
+    return pages, stats
+
+def _page_ranges(page_count):
+    for first in range(1, page_count + 1, OCR_PAGES_PER_TASK):
+        yield first, min(first + OCR_PAGES_PER_TASK - 1, page_count)
+
+def _ocr_parallel(pdf_path, ranges):
+    """OCR page ranges across a process pool, keeping page order.
+
+    At most two ranges per process are in flight, so peak memory is bounded
+    by OCR_WORKERS * 2 * OCR_PAGES_PER_TASK page images whatever the PDF size.
+    """
+    window = OCR_WORKERS * 2
+    with ProcessPoolExecutor(max_workers=OCR_WORKERS, initializer=_init_ocr_process) as pool:
+        pending = deque()
+        for first, last in ranges:
+            pending.append(pool.submit(_ocr_page_range, pdf_path, first, last))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _ocr_pages(pdf_path, parallel):
+    ranges = list(_page_ranges(pdfinfo_from_path(pdf_path)["Pages"]))
+    if parallel and OCR_WORKERS > 1 and len(ranges) > 1:
+        results = _ocr_parallel(pdf_path, ranges)
+    else:
+        results = (_ocr_page_range(pdf_path, first, last) for first, last in ranges)
+    pages = []
+    totals = _new_stats()
+    for range_pages, stats in results:
+        pages.extend(range_pages)
+        for name in ("hits", "misses", "blank", "text_layer"):
+            totals[name] += stats[name]
+        totals["timings"].extend(stats["timings"])
+    _log_stats(len(pages), totals)
+    return pages
+
+def _log_stats(page_count, totals):
+    ocr_cache_stats["hits"] += totals["hits"]
+    ocr_cache_stats["misses"] += totals["misses"]
+    for page, source, seconds in totals["timings"]:
+        logger.debug("page %d: %s in %.3fs", page, source, seconds)
+    ocr_seconds = [seconds for _, source, seconds in totals["timings"] if source == "ocr"]
+    logger.info(
+        "OCR of %d pages: %d from text layer, %d blank, %d cache hits, %d OCRed (%.2fs avg)",
+        page_count, totals["text_layer"], totals["blank"], totals["hits"], totals["misses"],
+        sum(ocr_seconds) / len(ocr_seconds) if ocr_seconds else 0.0,
+    )
+
+def extract_pages_from_pdf(file, parallel=OCR_PARALLEL):
+    """Return the text of each page of the PDF in `file`, in page order."""
+    path = getattr(file, "name", None)
+    if isinstance(path, str) and os.path.isfile(path):
+        return _ocr_pages(path, parallel)
+    # Uploaded streams are spooled to disk so workers can rasterize page ranges
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+        shutil.copyfileobj(file, tmp)
+        tmp.flush()
+        return _ocr_pages(tmp.name, parallel)
+
+def extract_text_from_pdf(file, parallel=OCR_PARALLEL):
+    return "\n".join(extract_pages_from_pdf(file, parallel))
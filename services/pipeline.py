@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DEFAULT_HOSTS, DEFAULT_VOICES, AUDIO_RENDITIONS, SCRATCH_DIR
+from services.ocr_service import extract_pages_from_pdf
+from services.text_cleaning import clean_pages
+from services.summarizer import summarize
+from services.llm_service import generate_script
+from services.audio_service import generate_audio, episode_synthesizer, render_episode
+from services.stream_service import StreamWriter
+from services.storage_service import enqueue_upload, expire_failed_uploads
+from services.job_service import get_job, set_stage, set_result, save_checkpoint, load_checkpoints
+from services.dedupe_service import minhash, find_similar, index_document
+from services.model_router import choose_model
+from services.voice_service import resolve_voice
+from utils.script_utils import parse_turns
+
+logger = logging.getLogger(__name__)
+
+def _run_stage(job, stage, checkpoints, fn, is_valid=None):
+    """Return the checkpointed output of `stage`, or run `fn` and checkpoint it."""
+    job_id = job["id"]
+    if stage in checkpoints and (is_valid is None or is_valid(checkpoints[stage])):
+        logger.info("job %s: resuming past stage %s", job_id, stage)
+        return checkpoints[stage]
+    set_stage(job_id, stage, job["locked_by"])
+    output = fn()
+    save_checkpoint(job_id, stage, output)
+    checkpoints[stage] = output
+    return output
+
+def _playback(uploaded):
+    """Result fields for the renditions ({name: url, or None while uploading}), cheapest first."""
+    if isinstance(uploaded, str):
+        # Checkpointed before renditions existed: a single MP3
+        uploaded = {"mp3": uploaded}
+    mimetypes = {rendition["name"]: rendition["mimetype"] for rendition in AUDIO_RENDITIONS}
+    order = list(mimetypes)
+    names = sorted(uploaded, key=lambda name: order.index(name) if name in order else len(order))
+    return {
+        "s3_url": uploaded.get("mp3", uploaded[names[0]]),
+        "renditions": [
+            {"name": name, "url": uploaded[name], "mimetype": mimetypes.get(name, "audio/mpeg")} for name in names
+        ],
+        "upload": "pending" if None in uploaded.values() else "done",
+    }
+
+def finish_upload(job_id, urls):
+    """Record a finished job's uploaded renditions; called by the background uploader."""
+    save_checkpoint(job_id, "upload", urls)
+    job = get_job(job_id)
+    result = {**(job["result"] or {}), **_playback(urls)}
+    result.pop("upload_error", None)
+    set_result(job_id, result)
+    shutil.rmtree(os.path.join(SCRATCH_DIR, str(job_id)), ignore_errors=True)
+
+def fail_upload(job_id, error):
+    """Record that a finished job's upload gave up; its scratch files stay for a retry."""
+    job = get_job(job_id)
+    set_result(job_id, {**(job["result"] or {}), "upload": "failed", "upload_error": error})
+
+def cleanup_failed_uploads():
+    """Delete the scratch files of uploads that were not retried within UPLOAD_FAILED_RETENTION."""
+    for job_id in expire_failed_uploads():
+        logger.info("job %s: upload was not retried, deleting its scratch files", job_id)
+        shutil.rmtree(os.path.join(SCRATCH_DIR, str(job_id)), ignore_errors=True)
+
+def _reuse_similar(job_id, signature, variant):
+    match = find_similar(signature, variant)
+    if match is None:
+        return None
+    prior_id, score = match
+    prior = load_checkpoints(prior_id)
+    if "script" not in prior or "upload" not in prior:
+        return None
+    logger.info("job %s: %.0f%% similar to job %s, reusing its script and audio", job_id, score * 100, prior_id)
+    for stage in ("route", "script", "upload"):
+        if stage in prior:
+            save_checkpoint(job_id, stage, prior[stage])
+    return {
+        **_playback(prior["upload"]), "model": prior.get("route"),
+        "reused_from": prior_id, "similarity": round(score, 3),
+    }
+
+def _scratch_dir(job_id):
+    """A private, empty scratch directory for the job; a retry starts from a clean one."""
+    path = os.path.join(SCRATCH_DIR, str(job_id))
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, mode=0o700)
+    return path
+
+def _script_and_audio(job, content, hosts, voices, model, use_cache, stream, scratch_dir):
+    """Write the script and voice it at the same time.
+
+    Turns go to the synthesizer as the LLM streams them, so synthesis (and
+    the progressive stream) starts while the rest of the script is written.
+    The script is checkpointed as soon as it is complete, so a synthesis
+    failure does not lose it.
+    """
+    synthesizer = episode_synthesizer(voices[0], voices[1], hosts)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        rendering = executor.submit(render_episode, synthesizer, scratch_dir, stream.write)
+        try:
+            # If synthesis fails first, add_turn drops the remaining turns; the script
+            # is still finished and checkpointed, and the synthesis error raised below
+            script = generate_script(content, hosts, on_turn=synthesizer.add_turn, use_cache=use_cache, model=model)
+        except Exception:
+            synthesizer.cancel()
+            raise
+        synthesizer.finish()
+        # Without turns, rendering fails below; the retry writes a new script
+        if parse_turns(script, hosts):
+            save_checkpoint(job["id"], "script", script)
+        set_stage(job["id"], "audio", job["locked_by"])
+        return rendering.result()
+
+def run_job(job):
+    """Run the OCR -> LLM -> TTS pipeline for one queued job and queue its upload.
+
+    Each stage's output is checkpointed, so a retried or crashed job picks up
+    after the last stage that finished.
+    """
+    job_id = job["id"]
+    payload = job["payload"]
+    checkpoints = load_checkpoints(job_id)
+    # Audio is stored under its content hash, so the owner and playlist are kept with the job
+    listing = {"user_id": job["user_id"], "playlist": payload.get("playlist")}
+
+    def ocr():
+        with open(payload["pdf_path"], "rb") as pdf:
+            return extract_pages_from_pdf(pdf)
+
+    # Per-page text, so running headers and footers can be detected when cleaning
+    pages = _run_stage(job, "ocr", checkpoints, ocr, is_valid=lambda output: isinstance(output, list))
+    hosts = payload.get("hosts", DEFAULT_HOSTS)
+    voices = [resolve_voice(voice) for voice in payload.get("voices", DEFAULT_VOICES)]
+    text = clean_pages(pages)
+
+    # A near-duplicate of a finished document with the same hosts and voices reuses its script and audio
+    variant = json.dumps({"hosts": list(hosts), "voices": [voice["hash"] for voice in voices]})
+    signature = minhash(text)
+    if signature is not None and not payload.get("fresh") and "script" not in checkpoints:
+        reused = _reuse_similar(job_id, signature, variant)
+        if reused is not None:
+            return {**reused, **listing}
+
+    content = summarize(text)
+    # Checkpointed so a retry keeps the model it started with, and recorded in the result
+    model = _run_stage(job, "route", checkpoints, lambda: choose_model(content))
+    if "upload" in checkpoints:
+        logger.info("job %s: resuming past stage upload", job_id)
+        uploaded = checkpoints["upload"]
+    else:
+        # ffmpeg writes the renditions straight into the job's scratch directory,
+        # where they are served from until the background upload finishes (see
+        # finish_upload). A retry starts from a clean directory and redoes synthesis
+        scratch_dir = _scratch_dir(job_id)
+        try:
+            stream = StreamWriter(job_id)
+            try:
+                if "script" in checkpoints:
+                    set_stage(job_id, "audio", job["locked_by"])
+                    renditions = generate_audio(
+                        checkpoints["script"], scratch_dir, voices[0], voices[1], hosts, on_clip=stream.write,
+                    )
+                else:
+                    set_stage(job_id, "script", job["locked_by"])
+                    renditions = _script_and_audio(
+                        job, content, hosts, voices, model, not payload.get("fresh"), stream, scratch_dir,
+                    )
+            finally:
+                stream.close()
+            formats = {rendition["name"]: rendition for rendition in AUDIO_RENDITIONS}
+            enqueue_upload(job_id, {
+                name: (path, formats[name]["extension"], formats[name]["mimetype"])
+                for name, path in renditions.items()
+            })
+        except BaseException:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+            raise
+        uploaded = dict.fromkeys(renditions)
+    if signature is not None:
+        index_document(job_id, signature, variant)
+    return {**_playback(uploaded), "model": model, **listing}
@@ -0,0 +1,335 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from config import (
+    S3_MULTIPART_THRESHOLD, S3_MULTIPART_CHUNKSIZE, S3_MAX_CONCURRENCY,
+    UPLOAD_POLL_INTERVAL, UPLOAD_LEASE_SECONDS, UPLOAD_MAX_ATTEMPTS, UPLOAD_RETRY_DELAY,
+    UPLOAD_FAILED_RETENTION,
+    STORAGE_BACKEND, LOCAL_STORAGE_DIR,
+)
+from utils.db import get_connection, transaction
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL REFERENCES job (id),
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    key TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    url TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    locked_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_upload_status ON upload (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS ix_upload_job ON upload (job_id);
+"""
+
+# Large episodes go up in parallel parts over the pooled connections
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+    max_concurrency=S3_MAX_CONCURRENCY,
+    use_threads=True,
+)
+
+_client = None
+_client_lock = threading.Lock()
+_storage = None
+
+def init_db():
+    conn = get_connection()
+    try:
+        conn.executescript(SCHEMA)
+    finally:
+        conn.close()
+
+def get_client():
+    """The process's S3 client, created on first use.
+
+    boto3 clients are thread-safe once created, but creating them is not;
+    the connection pool is sized for a full multipart transfer.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = boto3.session.Session().client("s3", config=Config(
+                max_pool_connections=S3_MAX_CONCURRENCY,
+                retries={"max_attempts": 3, "mode": "standard"},
+            ))
+    return _client
+
+class S3Storage:
+    """Objects in the AWS_BUCKET bucket, addressed by s3:// URLs."""
+
+    scheme = "s3"
+
+    def __init__(self, bucket=None):
+        self.bucket = bucket or os.environ['AWS_BUCKET']
+
+    def url(self, key):
+        return f"s3://{self.bucket}/{key}"
+
+    def exists(self, key):
+        try:
+            get_client().head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def put(self, path, key, content_type):
+        """Upload a local file (multipart when large) and return its URL."""
+        get_client().upload_file(
+            path, self.bucket, key, ExtraArgs={"ContentType": content_type}, Config=TRANSFER_CONFIG,
+        )
+        return self.url(key)
+
+    def local_path(self, url):
+        return None
+
+    def download_url(self, url, expires=3600):
+        """A temporary HTTPS link for one of this backend's URLs."""
+        bucket, key = url[len("s3://"):].split("/", 1)
+        return get_client().generate_presigned_url(
+            "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=expires,
+        )
+
+class LocalStorage:
+    """Objects in a local directory, addressed by file:// URLs; for test and on-prem setups without S3."""
+
+    scheme = "file"
+
+    def __init__(self, root=LOCAL_STORAGE_DIR):
+        self.root = os.path.abspath(root)
+
+    def url(self, key):
+        return f"file://{os.path.join(self.root, key)}"
+
+    def exists(self, key):
+        return os.path.exists(os.path.join(self.root, key))
+
+    def put(self, path, key, content_type):
+        target = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Copy then rename, so a reader never sees a partial object; the temp file
+        # is unique, as two jobs may store the same content at once
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f, open(path, "rb") as source:
+                shutil.copyfileobj(source, f)
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return self.url(key)
+
+    def local_path(self, url):
+        return url[len("file://"):]
+
+    def download_url(self, url, expires=3600):
+        return None
+
+BACKENDS = {"s3": S3Storage, "local": LocalStorage}
+
+def get_storage():
+    """The STORAGE_BACKEND new uploads go to."""
+    global _storage
+    with _client_lock:
+        if _storage is None:
+            _storage = BACKENDS[STORAGE_BACKEND]()
+    return _storage
+
+def storage_for(url):
+    """The backend that holds `url`, which need not be the current STORAGE_BACKEND."""
+    storage = get_storage()
+    if url.startswith(f"{storage.scheme}://"):
+        return storage
+    if url.startswith("s3://"):
+        return S3Storage(url[len("s3://"):].split("/", 1)[0])
+    return LocalStorage()
+
+def content_key(path, extension):
+    """Storage key derived from the file's SHA-256, so identical audio is stored once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return f"audio/{digest.hexdigest()}.{extension}"
+
+def enqueue_upload(job_id, files):
+    """Queue a job's files for background upload.
+
+    `files` maps a name to (local path, extension, content type). Each
+    file is stored under its content hash (see content_key). The files
+    must stay in place until the upload finishes.
+    """
+    now = time.time()
+    rows = [
+        (job_id, name, path, content_key(path, extension), content_type, now, now, now)
+        for name, (path, extension, content_type) in files.items()
+    ]
+    with transaction() as conn:
+        # A retried job replaces whatever it queued before
+        conn.execute("DELETE FROM upload WHERE job_id = ?", (job_id,))
+        conn.executemany(
+            "INSERT INTO upload (job_id, name, path, key, content_type, next_attempt_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+def _claim_upload():
+    # Like claim_job: an upload whose lease expired (its worker died) is runnable again.
+    # Uploads wait for their job to complete, so the job's result is final by the
+    # time the uploader fills in the URLs
+    now = time.time()
+    with transaction() as conn:
+        row = conn.execute(
+            "SELECT upload.* FROM upload JOIN job ON job.id = upload.job_id WHERE job.status = 'done' "
+            "AND ((upload.status = 'pending' AND upload.next_attempt_at <= ?) "
+            "OR (upload.status = 'uploading' AND upload.locked_until < ?)) ORDER BY upload.id LIMIT 1",
+            (now, now),
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE upload SET status = 'uploading', attempts = attempts + 1, locked_until = ?, updated_at = ? "
+            "WHERE id = ?",
+            (now + UPLOAD_LEASE_SECONDS, now, row["id"]),
+        )
+    return dict(row, attempts=row["attempts"] + 1)
+
+def _finish_upload(upload_id, url):
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE upload SET status = 'done', url = ?, error = NULL, locked_until = NULL, updated_at = ? "
+            "WHERE id = ?",
+            (url, time.time(), upload_id),
+        )
+
+def _retry_upload(upload, error):
+    # Exponential backoff: UPLOAD_RETRY_DELAY, then twice that, and so on
+    now = time.time()
+    failed = upload["attempts"] >= UPLOAD_MAX_ATTEMPTS
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE upload SET status = ?, error = ?, next_attempt_at = ?, locked_until = NULL, updated_at = ? "
+            "WHERE id = ?",
+            (
+                "failed" if failed else "pending", error,
+                now + UPLOAD_RETRY_DELAY * 2 ** (upload["attempts"] - 1), now, upload["id"],
+            ),
+        )
+    return failed
+
+def retry_uploads(job_id):
+    """Queue a job's failed uploads again with fresh attempts; returns how many were queued."""
+    now = time.time()
+    with transaction() as conn:
+        cur = conn.execute(
+            "UPDATE upload SET status = 'pending', attempts = 0, next_attempt_at = ?, updated_at = ? "
+            "WHERE job_id = ? AND status = 'failed'",
+            (now, now, job_id),
+        )
+        return cur.rowcount
+
+def expire_failed_uploads():
+    """Forget uploads that gave up more than UPLOAD_FAILED_RETENTION ago; returns their job ids.
+
+    The caller deletes the jobs' local files.
+    """
+    cutoff = time.time() - UPLOAD_FAILED_RETENTION
+    with transaction() as conn:
+        rows = conn.execute(
+            "SELECT DISTINCT job_id FROM upload WHERE status = 'failed' AND updated_at < ?", (cutoff,),
+        ).fetchall()
+        conn.execute("DELETE FROM upload WHERE status = 'failed' AND updated_at < ?", (cutoff,))
+    return [row["job_id"] for row in rows]
+
+def local_file(job_id, name):
+    """Path of a job's file that is not uploaded yet, or None."""
+    conn = get_connection()
+    try:
+        row = conn.execute(
+            "SELECT path FROM upload WHERE job_id = ? AND name = ? AND status != 'done'", (job_id, name),
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None or not os.path.exists(row["path"]):
+        return None
+    return row["path"]
+
+def job_uploads(job_id):
+    """{name: url} once every file of the job is uploaded, else None."""
+    conn = get_connection()
+    try:
+        rows = conn.execute("SELECT name, status, url FROM upload WHERE job_id = ?", (job_id,)).fetchall()
+    finally:
+        conn.close()
+    if not rows or any(row["status"] != "done" for row in rows):
+        return None
+    return {row["name"]: row["url"] for row in rows}
+
+def upload_forever(on_uploaded, on_failed):
+    """Upload queued files one at a time, retrying failures with backoff.
+
+    `on_uploaded(job_id, urls)` is called once all of a job's files are up,
+    and `on_failed(job_id, error)` when one of them gives up after
+    UPLOAD_MAX_ATTEMPTS (see retry_uploads).
+    """
+    while True:
+        upload = _claim_upload()
+        if upload is None:
+            time.sleep(UPLOAD_POLL_INTERVAL)
+            continue
+        storage = get_storage()
+        try:
+            # Identical audio (e.g. a regenerated episode) is already stored; just reference it
+            if storage.exists(upload["key"]):
+                url = storage.url(upload["key"])
+                logger.info("job %s: %s already stored", upload["job_id"], upload["name"])
+            else:
+                url = storage.put(upload["path"], upload["key"], upload["content_type"])
+        except Exception as e:
+            failed = _retry_upload(upload, str(e))
+            logger.warning(
+                "upload %s of job %s failed (attempt %s)%s", upload["name"], upload["job_id"], upload["attempts"],
+                ", giving up" if failed else "", exc_info=True,
+            )
+            if failed:
+                try:
+                    on_failed(upload["job_id"], str(e))
+                except Exception:
+                    logger.exception("job %s: recording the failed upload failed", upload["job_id"])
+            continue
+        _finish_upload(upload["id"], url)
+        logger.info("job %s: stored %s at %s", upload["job_id"], upload["name"], url)
+        urls = job_uploads(upload["job_id"])
+        if urls is not None:
+            try:
+                on_uploaded(upload["job_id"], urls)
+            except Exception:
+                logger.exception("job %s: finishing the upload failed", upload["job_id"])
+
+def start_uploader(on_uploaded, on_failed):
+    thread = threading.Thread(target=upload_forever, args=(on_uploaded, on_failed), name="uploader", daemon=True)
+    thread.start()
+    return thread
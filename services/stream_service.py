@@ -0,0 +1,88 @@
+import io
+import os
+import shutil
+import time
+
+import numpy as np
+from pydub import AudioSegment
+
+from config import STREAM_DIR, STREAM_BITRATE, STREAM_IDLE_TIMEOUT, STREAM_RETENTION, TTS_TURN_GAP_MS
+
+DONE_MARKER = "done"
+POLL_SECONDS = 0.25
+
+def _stream_dir(job_id):
+    return os.path.join(STREAM_DIR, str(job_id))
+
+class StreamWriter:
+    """Writes a job's synthesized turns as numbered, independently playable MP3 chunks.
+
+    Concatenated in order the chunks form one progressive MP3 stream;
+    stream_chunks() serves them to listeners while synthesis continues.
+    """
+
+    def __init__(self, job_id):
+        self.directory = _stream_dir(job_id)
+        # A retried job starts its stream over
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory)
+        self._index = 0
+
+    def write(self, wav, sample_rate):
+        pcm = (np.clip(wav, -1.0, 1.0) * 32767).astype(np.int16)
+        turn = AudioSegment(pcm.tobytes(), frame_rate=sample_rate, sample_width=2, channels=1)
+        turn += AudioSegment.silent(duration=TTS_TURN_GAP_MS, frame_rate=sample_rate)
+        buffer = io.BytesIO()
+        # Bare MP3 frames: an ID3 tag or Xing header in the middle of the stream
+        # plays as a glitch or gap at every turn boundary
+        turn.export(
+            buffer, format="mp3", bitrate=STREAM_BITRATE,
+            parameters=["-write_xing", "0", "-id3v2_version", "0"],
+        )
+        path = os.path.join(self.directory, f"{self._index:05d}.mp3")
+        with open(path + ".tmp", "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(path + ".tmp", path)
+        self._index += 1
+
+    def close(self):
+        open(os.path.join(self.directory, DONE_MARKER), "w").close()
+
+def has_stream(job_id):
+    return os.path.isdir(_stream_dir(job_id))
+
+def stream_chunks(job_id):
+    """Yield the job's MP3 chunks in order, waiting for new ones until the stream is closed."""
+    directory = _stream_dir(job_id)
+    index = 0
+    last_chunk = time.monotonic()
+    while time.monotonic() - last_chunk < STREAM_IDLE_TIMEOUT:
+        path = os.path.join(directory, f"{index:05d}.mp3")
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            # The marker is written after the last chunk, so check for it before giving up.
+            # A missing directory means the stream was cleaned up or restarted by a retry
+            if not os.path.isdir(directory) or (
+                os.path.exists(os.path.join(directory, DONE_MARKER)) and not os.path.exists(path)
+            ):
+                return
+            time.sleep(POLL_SECONDS)
+            continue
+        yield data
+        index += 1
+        last_chunk = time.monotonic()
+
+def cleanup_streams():
+    """Delete finished streams older than STREAM_RETENTION."""
+    if not os.path.isdir(STREAM_DIR):
+        return
+    cutoff = time.time() - STREAM_RETENTION
+    for entry in os.scandir(STREAM_DIR):
+        marker = os.path.join(entry.path, DONE_MARKER)
+        try:
+            if os.path.getmtime(marker) < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except FileNotFoundError:
+            continue
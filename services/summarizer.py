@@ -0,0 +1,45 @@
+import logging
+import re
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from config import SUMMARY_TOKEN_BUDGET
+from utils.token_utils import count_tokens
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])|\n\s*\n")
+MIN_SENTENCE_WORDS = 4
+
+def split_sentences(text):
+    sentences = (" ".join(s.split()) for s in SENTENCE_RE.split(text))
+    return [s for s in sentences if len(s.split()) >= MIN_SENTENCE_WORDS]
+
+def summarize(text, token_budget=SUMMARY_TOKEN_BUDGET):
+    """Shrink `text` to about `token_budget` tokens by keeping its most central sentences.
+
+    Sentences are scored by TF-IDF similarity to the document as a whole,
+    picked best-first until the budget is spent, and returned in their
+    original order. Text already within budget is returned unchanged.
+    """
+    total = count_tokens(text)
+    if total <= token_budget:
+        return text
+    sentences = split_sentences(text)
+    if not sentences:
+        return text
+
+    matrix = TfidfVectorizer(stop_words="english", sublinear_tf=True).fit_transform(sentences)
+    centroid = matrix.mean(axis=0)
+    scores = (matrix @ centroid.T).A1
+
+    kept, used = [], 0
+    for i in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+        tokens = count_tokens(sentences[i])
+        if used + tokens > token_budget:
+            continue
+        kept.append(i)
+        used += tokens
+    summary = " ".join(sentences[i] for i in sorted(kept))
+    logger.info("summarized %d -> %d tokens (%d of %d sentences)", total, used, len(kept), len(sentences))
+    return summary
@@ -0,0 +1,72 @@
+import logging
+import re
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Lines this close to the top or bottom of a page are header/footer candidates
+EDGE_LINES = 3
+# A candidate repeated on at least this share of pages is treated as boilerplate
+REPEAT_RATIO = 0.4
+MIN_REPEAT_PAGES = 3
+
+ROMAN = r"(?=[ivxlcdm])m{0,3}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})"
+PAGE_NUMBER_RE = re.compile(rf"^\s*(page\s*)?(\d+|{ROMAN})(\s*(of|/)\s*\d+)?\s*$", re.IGNORECASE)
+REFERENCES_RE = re.compile(r"^\s*(\d+\.?\s*)?(references|bibliography|works cited|literature cited)\s*$", re.IGNORECASE)
+HYPHENATION_RE = re.compile(r"(\w)-\n\s*([a-z])")
+BLANK_LINES_RE = re.compile(r"\n\s*\n(\s*\n)+")
+
+def _line_key(line):
+    # Running headers often differ only by the page or chapter number
+    return re.sub(r"\d+", "#", " ".join(line.lower().split()))
+
+def _edge_indices(lines):
+    content = [i for i, line in enumerate(lines) if line.strip()]
+    return set(content[:EDGE_LINES] + content[-EDGE_LINES:])
+
+def _edge_lines(lines):
+    return [lines[i] for i in sorted(_edge_indices(lines))]
+
+def _repeated_lines(pages_lines):
+    counts = Counter()
+    for lines in pages_lines:
+        counts.update({_line_key(line) for line in _edge_lines(lines)})
+    min_pages = max(MIN_REPEAT_PAGES, int(len(pages_lines) * REPEAT_RATIO))
+    return {key for key, count in counts.items() if count >= min_pages}
+
+def _strip_references(lines):
+    # Only a heading in the back third of the document counts as the reference section
+    for i in range(len(lines) - 1, int(len(lines) * 2 / 3) - 1, -1):
+        if REFERENCES_RE.match(lines[i]):
+            return lines[:i]
+    return lines
+
+def clean_pages(pages):
+    """Join per-page text into one document without the boilerplate.
+
+    Drops running headers and footers repeated across pages, page numbers
+    in the header or footer and a trailing reference section, and rejoins
+    words hyphenated across line breaks.
+    """
+    pages_lines = [page.splitlines() for page in pages]
+    repeated = _repeated_lines(pages_lines) if len(pages) >= MIN_REPEAT_PAGES else set()
+    lines = []
+    for page_lines in pages_lines:
+        # Only header and footer lines can be page numbers or running boilerplate;
+        # a bare number in the body is a table cell or a heading
+        edges = _edge_indices(page_lines)
+        for i, line in enumerate(page_lines):
+            if i in edges and (PAGE_NUMBER_RE.match(line) or _line_key(line) in repeated):
+                continue
+            lines.append(line)
+        lines.append("")
+    text = "\n".join(_strip_references(lines))
+    text = HYPHENATION_RE.sub(r"\1\2", text)
+    text = BLANK_LINES_RE.sub("\n\n", text).strip()
+
+    raw_size = sum(len(page) for page in pages)
+    logger.info(
+        "cleaned text: %d -> %d chars (%.0f%% removed)",
+        raw_size, len(text), 100 * (1 - len(text) / raw_size) if raw_size else 0,
+    )
+    return text
@@ -0,0 +1,138 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import torch
+from TTS.tts.configs.xtts_config import XttsConfig
+from TTS.tts.models.xtts import Xtts
+from transformers.pytorch_utils import Conv1D
+
+from config import TTS_MODEL_DIR, TTS_LANGUAGE, TTS_QUANTIZE, DEFAULT_VOICES
+from services.voice_service import resolve_voice, latent_path
+
+logger = logging.getLogger(__name__)
+
+def _conv1d_to_linear(module):
+    """Replace every transformers Conv1D under `module` with the equivalent nn.Linear.
+
+    Conv1D computes x @ weight + bias with weight stored as (in, out);
+    nn.Linear stores the transpose. Returns the number of layers replaced.
+    """
+    count = 0
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features, device=child.weight.device)
+            with torch.no_grad():
+                linear.weight.copy_(child.weight.t())
+                linear.bias.copy_(child.bias)
+            setattr(module, name, linear)
+            count += 1
+        else:
+            count += _conv1d_to_linear(child)
+    return count
+
+class XttsEngine:
+    """The XTTS model loaded once from TTS_MODEL_DIR, for synth_server.py.
+
+    Speaker conditioning latents are computed once per voice and kept in
+    memory and on disk (see voice_service.latent_path), so reference audio
+    is only processed the first time a voice is used.
+    """
+
+    MEMORY_LATENTS = 32
+
+    def __init__(self, model_dir=TTS_MODEL_DIR, quantize=TTS_QUANTIZE):
+        self.model_dir = model_dir
+        self.quantize = quantize
+        self.model = None
+        self.config = None
+        self.sample_rate = None
+        self._voices = {}
+        self._latents = OrderedDict()
+        self._latents_lock = threading.Lock()
+
+    def load(self):
+        started = time.perf_counter()
+        self.config = XttsConfig()
+        self.config.load_json(os.path.join(self.model_dir, "config.json"))
+        self.model = Xtts.init_from_config(self.config)
+        self.model.load_checkpoint(self.config, checkpoint_dir=self.model_dir, eval=True)
+        if torch.cuda.is_available():
+            self.model.cuda()
+        self.sample_rate = self.config.model_args.output_sample_rate
+        if self.quantize == "int8":
+            self.quantize_int8()
+        # Xtts.inference computes latents from the reference wav on every call;
+        # route that through the cache instead
+        self._compute_latents = self.model.get_conditioning_latents
+        self.model.get_conditioning_latents = self._conditioning_latents
+        logger.info("XTTS loaded from %s in %.1fs", self.model_dir, time.perf_counter() - started)
+
+    def quantize_int8(self):
+        """Swap the model's linear layers for dynamically quantized int8 ones (CPU only)."""
+        if next(self.model.parameters()).is_cuda:
+            logger.warning("int8 quantization is CPU-only; keeping the float model on GPU")
+            self.quantize = ""
+            return
+        started = time.perf_counter()
+        # The GPT backbone's projections are transformers Conv1D layers, which
+        # quantize_dynamic does not know; as nn.Linear they are quantized too
+        converted = _conv1d_to_linear(self.model)
+        torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        self.quantize = "int8"
+        # Latents from the float conditioning encoder do not apply to the quantized one
+        with self._latents_lock:
+            self._latents.clear()
+        logger.info(
+            "quantized XTTS linear layers (%d converted from Conv1D) to int8 in %.1fs",
+            converted, time.perf_counter() - started,
+        )
+
+    def warm_up(self):
+        # The first inference pays for lazy initialisation and allocator growth
+        started = time.perf_counter()
+        self.synthesize("Hello there.", DEFAULT_VOICES[0])
+        logger.info("XTTS warmed up in %.1fs", time.perf_counter() - started)
+
+    def _conditioning_latents(self, audio_path, gpt_cond_len=3):
+        # gpt_cond_len is fixed by our inference settings, so the voice alone is the key
+        voice = self._voices[audio_path]
+        key = (voice["owner"], voice["hash"], self.quantize)
+        with self._latents_lock:
+            if key in self._latents:
+                self._latents.move_to_end(key)
+                return self._latents[key]
+        path = latent_path(voice, self.quantize)
+        device = next(self.model.parameters()).device
+        if os.path.exists(path):
+            latents = tuple(None if t is None else t.to(device) for t in torch.load(path, map_location="cpu"))
+        else:
+            started = time.perf_counter()
+            latents = self._compute_latents(audio_path, gpt_cond_len=gpt_cond_len)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Latents the checkpoint's decoder does not use come back as None.
+            # Sibling synthesis processes may compute the same voice at once:
+            # write then rename, so none of them loads a half-written file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                torch.save(tuple(None if t is None else t.cpu() for t in latents), f)
+            os.replace(tmp_path, path)
+            logger.info("computed latents for voice %s in %.1fs", voice["hash"], time.perf_counter() - started)
+        with self._latents_lock:
+            self._latents[key] = latents
+            while len(self._latents) > self.MEMORY_LATENTS:
+                self._latents.popitem(last=False)
+        return latents
+
+    def synthesize(self, text, voice, language=TTS_LANGUAGE):
+        """Return `text` spoken in `voice` (a voice dict or wav path) as float32 samples."""
+        voice = resolve_voice(voice)
+        self._voices[voice["path"]] = voice
+        with torch.inference_mode():
+            output = self.model.synthesize(text, self.config, speaker_wav=voice["path"], language=language)
+        return np.asarray(output["wav"], dtype=np.float32)
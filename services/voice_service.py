@@ -0,0 +1,52 @@
+import hashlib
+import io
+import os
+
+from pydub import AudioSegment
+
+from config import VOICES_DIR, VOICE_STORE_DIR, TTS_SAMPLE_RATE
+
+# A voice is {"path": reference wav, "hash": content hash, "owner": user id or "default"};
+# the synthesis server keys its conditioning-latent cache on owner and hash.
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()[:32]
+
+def default_voice(name):
+    # Only bare file names from the voices directory can be picked on the form
+    path = os.path.join(VOICES_DIR, os.path.basename(name))
+    return {"path": path, "hash": _file_hash(path), "owner": "default"}
+
+def resolve_voice(voice):
+    """Accept a voice dict or a plain path to a reference wav."""
+    if isinstance(voice, dict):
+        return voice
+    return {"path": voice, "hash": _file_hash(voice), "owner": "default"}
+
+def save_custom_voice(file, user_id):
+    """Store an uploaded reference clip as mono 16-bit WAV at TTS_SAMPLE_RATE.
+
+    Normalizing once here means the same recording always hashes the same,
+    and synthesis never has to resample it again.
+    """
+    audio = AudioSegment.from_file(file).set_channels(1).set_frame_rate(TTS_SAMPLE_RATE).set_sample_width(2)
+    buffer = io.BytesIO()
+    audio.export(buffer, format="wav")
+    data = buffer.getvalue()
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    directory = os.path.join(VOICE_STORE_DIR, str(user_id))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{digest}.wav")
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    return {"path": path, "hash": digest, "owner": str(user_id)}
+
+def latent_path(voice, quantize=""):
+    # Float and quantized conditioning encoders produce different latents
+    suffix = f".{quantize}" if quantize else ""
+    return os.path.join(VOICE_STORE_DIR, voice["owner"], f"{voice['hash']}.latents{suffix}.pt")
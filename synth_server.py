@@ -0,0 +1,83 @@
+# Entry point for the speech synthesis server: python synth_server.py
+#
+# Run one per node. It loads XTTS once, then forks TTS_PROCESSES synthesis
+# processes that share the loaded weights copy-on-write and accept job workers'
+# connections on one Unix socket (see services/audio_service.py for the client).
+# On a GPU node it serves from the loading process instead, since CUDA does not
+# survive fork.
+import logging
+import multiprocessing
+import os
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+import torch
+
+from config import TTS_SOCKET, TTS_AUTHKEY, TTS_PROCESSES, TTS_THREADS_PER_PROCESS
+from services.tts_engine import XttsEngine
+
+logger = logging.getLogger("unipod.synth")
+
+def handle_connection(conn, engine, lock):
+    with conn:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                return
+            try:
+                with lock:
+                    wav = engine.synthesize(request["text"], request["voice"])
+            except Exception as e:
+                logger.exception("synthesis failed")
+                conn.send({"error": str(e)})
+            else:
+                conn.send({"wav": wav, "sample_rate": engine.sample_rate})
+
+def serve(listener, engine):
+    # XTTS keeps per-call state on the model, so a process runs one synthesis at
+    # a time; parallelism comes from the sibling processes
+    torch.set_num_threads(TTS_THREADS_PER_PROCESS)
+    lock = threading.Lock()
+    while True:
+        try:
+            conn = listener.accept()
+        except (OSError, AuthenticationError):
+            logger.warning("rejected connection", exc_info=True)
+            continue
+        threading.Thread(target=handle_connection, args=(conn, engine, lock), daemon=True).start()
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+    # No intra-op thread pool in the parent: OpenMP state does not survive fork
+    torch.set_num_threads(1)
+    engine = XttsEngine()
+    engine.load()
+    # Warm up before forking: the children inherit the default voice's latents
+    # in memory instead of each computing (and writing) them at once
+    engine.warm_up()
+
+    if os.path.exists(TTS_SOCKET):
+        os.remove(TTS_SOCKET)
+    with Listener(TTS_SOCKET, family="AF_UNIX", authkey=TTS_AUTHKEY) as listener:
+        if next(engine.model.parameters()).is_cuda:
+            # CUDA cannot be used in a forked child: on a GPU the model runs in this process
+            if TTS_PROCESSES > 1:
+                logger.warning("model is on CUDA; ignoring TTS_PROCESSES=%d and serving in one process", TTS_PROCESSES)
+            logger.info("listening on %s on the GPU", TTS_SOCKET)
+            serve(listener, engine)
+            return
+        logger.info("listening on %s with %d processes", TTS_SOCKET, TTS_PROCESSES)
+        context = multiprocessing.get_context("fork")
+        procs = [
+            context.Process(target=serve, args=(listener, engine), name=f"synth-{i}")
+            for i in range(TTS_PROCESSES)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+
+if __name__ == '__main__':
+    main()
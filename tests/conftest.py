@@ -0,0 +1,13 @@
+import pytest
+
+from services import dedupe_service, job_service, storage_service
+from utils import db
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh SQLite database with every table, in place of instance/users.db."""
+    monkeypatch.setattr(db, "DATABASE_PATH", str(tmp_path / "users.db"))
+    job_service.init_db()
+    dedupe_service.init_db()
+    storage_service.init_db()
+    return db.DATABASE_PATH
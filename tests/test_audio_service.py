@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from config import TTS_MAX_CHARS
+from services.audio_service import assemble_episode, render_episode, _split_text
+
+def test_overlapping_turns_crossfade_without_a_jump():
+    sample_rate = 1000
+    turn = np.full(1000, 0.5, dtype=np.float32)
+
+    pcm = assemble_episode([turn, turn], sample_rate, gap_ms=-20, fade_ms=10)
+
+    # Turns overlap by 20 samples and the whole timeline is one level
+    assert len(pcm) == 1980
+    steps = np.abs(np.diff(pcm[100:-100].astype(np.int32)))
+    assert steps.max() <= 1
+    assert abs(int(pcm[990]) - 16383) <= 1
+
+def test_turns_are_separated_by_the_gap():
+    turn = np.full(100, 0.5, dtype=np.float32)
+
+    pcm = assemble_episode([turn, turn], 1000, gap_ms=50, fade_ms=0)
+
+    assert len(pcm) == 300
+    assert not pcm[100:150].any()
+    assert (pcm[150:250] == 16383).all()
+
+def test_short_overlap_crossfades_over_the_overlap_only():
+    turn = np.full(1000, 0.5, dtype=np.float32)
+
+    pcm = assemble_episode([turn, turn], 1000, gap_ms=-5, fade_ms=10)
+
+    assert np.abs(np.diff(pcm[100:-100].astype(np.int32))).max() <= 1
+
+def test_run_on_sentences_are_split_under_the_limit():
+    run_on = ", ".join(f"and then clause number {n} went on" for n in range(40))
+    unpunctuated = " ".join(f"word{n}" for n in range(200))
+
+    for text in (run_on, unpunctuated, "x" * (TTS_MAX_CHARS * 2 + 5)):
+        pieces = _split_text(text)
+        assert all(len(piece) <= TTS_MAX_CHARS for piece in pieces)
+        assert "".join(pieces).replace(" ", "") == text.replace(" ", "")
+
+def test_run_on_sentences_split_at_commas_first():
+    clause = "a" * (TTS_MAX_CHARS // 2)
+    pieces = _split_text(f"{clause}, {clause}, {clause}")
+
+    assert all(piece.endswith(",") or piece == clause for piece in pieces)
+
+def test_greetings_and_sign_offs_are_not_packed_with_topic_text():
+    pieces = _split_text(
+        "Welcome back to UniPod, I'm Jordan! Today we're talking about the French Revolution. "
+        "It began in 1789. It changed Europe. Thanks for listening!"
+    )
+
+    assert pieces[0] == "Welcome back to UniPod, I'm Jordan!"
+    assert pieces[-1] == "Thanks for listening!"
+    assert "Today we're talking about the French Revolution. It began in 1789." in pieces[1]
+
+class _NoTurns:
+    def clips(self):
+        return iter(())
+
+def test_an_episode_without_turns_is_an_error(tmp_path):
+    with pytest.raises(RuntimeError, match="no turns"):
+        render_episode(_NoTurns(), str(tmp_path))
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+
+from services import pipeline
+from services.dedupe_service import find_similar, index_document, minhash, similarity
+from services.job_service import enqueue_job, load_checkpoints, save_checkpoint
+
+VARIANT = json.dumps({"hosts": ["Jordan", "Taylor"], "voices": ["a", "b"]})
+
+def _document(seed, words=600):
+    vocabulary = [f"word{i}" for i in range(2000)]
+    return " ".join(np.random.RandomState(seed).choice(vocabulary, size=words))
+
+def _edited(text):
+    # A light edit: a few words changed, far apart
+    words = text.split()
+    for i in (100, 300, 500):
+        words[i] = "edited"
+    return " ".join(words)
+
+def test_minhash_estimates_how_much_text_is_shared():
+    text = _document(1)
+
+    assert minhash("too short to compare") is None
+    assert similarity(minhash(text), minhash(text)) == 1.0
+    assert similarity(minhash(text), minhash(_edited(text))) > 0.85
+    assert similarity(minhash(text), minhash(_document(2))) < 0.1
+
+def test_lsh_finds_a_lightly_edited_document_only(database):
+    text = _document(1)
+    index_document(1, minhash(text), VARIANT)
+    index_document(2, minhash(_document(2)), VARIANT)
+
+    match = find_similar(minhash(_edited(text)), VARIANT)
+
+    assert match is not None and match[0] == 1
+    assert find_similar(minhash(_document(3)), VARIANT) is None
+
+def _finished_job(text, variant):
+    job_id = enqueue_job(1, {})
+    save_checkpoint(job_id, "route", "llama3")
+    save_checkpoint(job_id, "script", "Jordan: Hello.\n\nTaylor: Hi.")
+    save_checkpoint(job_id, "upload", {"mp3": "s3://bucket/audio/abc.mp3"})
+    index_document(job_id, minhash(text), variant)
+    return job_id
+
+def test_an_edited_document_reuses_the_earlier_job(database):
+    text = _document(1)
+    prior = _finished_job(text, VARIANT)
+    job_id = enqueue_job(1, {})
+
+    reused = pipeline._reuse_similar(job_id, minhash(_edited(text)), VARIANT)
+
+    assert reused["reused_from"] == prior
+    assert reused["s3_url"] == "s3://bucket/audio/abc.mp3"
+    assert load_checkpoints(job_id)["script"] == "Jordan: Hello.\n\nTaylor: Hi."
+
+def test_other_voices_or_hosts_do_not_reuse(database):
+    text = _document(1)
+    _finished_job(text, VARIANT)
+    job_id = enqueue_job(1, {})
+
+    for variant in (
+        json.dumps({"hosts": ["Jordan", "Taylor"], "voices": ["a", "c"]}),
+        json.dumps({"hosts": ["Sam", "Taylor"], "voices": ["a", "b"]}),
+    ):
+        assert pipeline._reuse_similar(job_id, minhash(text), variant) is None
+    assert load_checkpoints(job_id) == {}
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from services import job_service
+from services.job_service import (
+    LeaseLost, claim_job, complete_job, enqueue_job, fail_job, get_job, list_jobs, renew_lease, requeue_job,
+    set_stage,
+)
+from utils.db import transaction
+
+def _expire_lease(job_id):
+    with transaction() as conn:
+        conn.execute("UPDATE job SET locked_until = ? WHERE id = ?", (time.time() - 1, job_id))
+
+def test_claim_takes_the_oldest_queued_job_once(database):
+    first = enqueue_job(1, {"n": 1})
+    enqueue_job(1, {"n": 2})
+
+    job = claim_job("worker-a")
+
+    assert job["id"] == first
+    assert job["status"] == "running"
+    assert job["locked_by"] == "worker-a"
+    assert job["attempts"] == 1
+    assert claim_job("worker-b")["id"] != first
+    assert claim_job("worker-c") is None
+
+def test_expired_lease_is_reclaimed_and_the_old_attempt_is_shut_out(database):
+    job_id = enqueue_job(1, {})
+    claim_job("worker-a")
+    _expire_lease(job_id)
+
+    job = claim_job("worker-b")
+
+    assert job["id"] == job_id
+    assert job["locked_by"] == "worker-b"
+    assert job["attempts"] == 2
+    assert not renew_lease(job_id, "worker-a")
+    with pytest.raises(LeaseLost):
+        set_stage(job_id, "ocr", "worker-a")
+    assert not complete_job(job_id, {"from": "a"}, "worker-a")
+    assert not requeue_job(job_id, "a failed", "worker-a")
+    assert not fail_job(job_id, "a failed", "worker-a")
+    assert complete_job(job_id, {"from": "b"}, "worker-b")
+    assert get_job(job_id)["result"] == {"from": "b"}
+
+def test_renewed_lease_is_not_reclaimed(database):
+    job_id = enqueue_job(1, {})
+    claim_job("worker-a")
+    _expire_lease(job_id)
+
+    assert renew_lease(job_id, "worker-a")
+    assert claim_job("worker-b") is None
+
+def test_job_fails_once_its_worker_is_lost_too_many_times(database, monkeypatch):
+    monkeypatch.setattr(job_service, "JOB_MAX_ATTEMPTS", 2)
+    job_id = enqueue_job(1, {})
+    for worker in ("worker-a", "worker-b"):
+        assert claim_job(worker)["id"] == job_id
+        _expire_lease(job_id)
+
+    assert claim_job("worker-c") is None
+    job = get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "worker lost too many times"
+
+def test_failed_job_can_be_retried_by_its_owner(database):
+    job_id = enqueue_job(1, {})
+    claim_job("worker-a")
+    assert fail_job(job_id, "boom", "worker-a")
+
+    assert requeue_job(job_id, "boom")
+    assert get_job(job_id)["status"] == "queued"
+
+def test_list_jobs_returns_a_users_finished_jobs_newest_first(database):
+    older = enqueue_job(1, {})
+    newer = enqueue_job(1, {})
+    enqueue_job(1, {})
+    enqueue_job(2, {})
+    for job_id in (older, newer):
+        claim_job("worker-a")
+        complete_job(job_id, {"n": job_id}, "worker-a")
+
+    assert [job["id"] for job in list_jobs(1, status="done")] == [newer, older]
+    assert len(list_jobs(1)) == 3
@@ -0,0 +1,28 @@
+import numpy as np
+from PIL import Image, ImageDraw
+
+from services.ocr_preprocess import preprocess_page
+
+def _noisy_page(mean=235, sigma=6, size=(850, 1100)):
+    rng = np.random.default_rng(0)
+    pixels = rng.normal(mean, sigma, size=(size[1], size[0])).clip(0, 255).astype(np.uint8)
+    return Image.fromarray(pixels, mode="L").convert("RGB")
+
+def test_noisy_off_white_page_is_blank():
+    assert preprocess_page(_noisy_page()) is None
+
+def test_white_page_is_blank():
+    assert preprocess_page(Image.new("RGB", (850, 1100), "white")) is None
+
+def test_page_with_text_is_kept_and_binarized():
+    page = _noisy_page()
+    draw = ImageDraw.Draw(page)
+    for y in range(100, 1000, 30):
+        draw.rectangle((80, y, 760, y + 8), fill=(20, 20, 20))
+
+    processed = preprocess_page(page)
+
+    assert processed is not None
+    pixels = np.asarray(processed.convert("L"))
+    # Paper noise goes to white; only the text lines are black
+    assert 0.15 < (pixels == 0).mean() < 0.35
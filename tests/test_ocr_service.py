@@ -0,0 +1,31 @@
+import os
+
+from services import ocr_service
+
+def _fake_text_layer(pdf_path, first_page, last_page):
+    # Every page has a usable text layer, so no page needs Tesseract
+    return [f"Text layer of page {page}. " * 4 for page in range(first_page, last_page + 1)]
+
+def _thread_limit_text_layer(pdf_path, first_page, last_page):
+    return [f"OMP_THREAD_LIMIT={os.environ.get('OMP_THREAD_LIMIT')} " * 4] * (last_page - first_page + 1)
+
+def test_ocr_pages_in_parallel_keeps_page_order(monkeypatch):
+    monkeypatch.setattr(ocr_service, "pdfinfo_from_path", lambda path: {"Pages": 20})
+    monkeypatch.setattr(ocr_service, "_text_layer", _fake_text_layer)
+    monkeypatch.setattr(ocr_service, "OCR_WORKERS", 2)
+    monkeypatch.setattr(ocr_service, "OCR_TEXT_LAYER", True)
+
+    pages = ocr_service._ocr_pages("document.pdf", parallel=True)
+
+    assert len(pages) == 20
+    assert [page.split(".")[0] for page in pages] == [f"Text layer of page {n}" for n in range(1, 21)]
+
+def test_ocr_pool_processes_use_one_tesseract_thread(monkeypatch):
+    monkeypatch.setattr(ocr_service, "pdfinfo_from_path", lambda path: {"Pages": ocr_service.OCR_PAGES_PER_TASK * 2})
+    monkeypatch.setattr(ocr_service, "_text_layer", _thread_limit_text_layer)
+    monkeypatch.setattr(ocr_service, "OCR_WORKERS", 2)
+    monkeypatch.setattr(ocr_service, "OCR_TEXT_LAYER", True)
+
+    pages = ocr_service._ocr_pages("document.pdf", parallel=True)
+
+    assert all(page.startswith("OMP_THREAD_LIMIT=1 ") for page in pages)
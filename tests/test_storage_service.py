@@ -0,0 +1,45 @@
+import time
+
+from services import storage_service
+from services.job_service import claim_job, complete_job, enqueue_job
+from services.storage_service import (
+    _claim_upload, _retry_upload, enqueue_upload, expire_failed_uploads, retry_uploads,
+)
+from utils.db import transaction
+
+def _finished_job_with_upload(tmp_path):
+    job_id = enqueue_job(1, {})
+    claim_job("worker-a")
+    path = tmp_path / "episode.mp3"
+    path.write_bytes(b"audio")
+    enqueue_upload(job_id, {"mp3": (str(path), "mp3", "audio/mpeg")})
+    complete_job(job_id, {}, "worker-a")
+    return job_id
+
+def _give_up(monkeypatch):
+    monkeypatch.setattr(storage_service, "UPLOAD_MAX_ATTEMPTS", 1)
+    upload = _claim_upload()
+    assert _retry_upload(upload, "bucket unreachable")
+    return upload
+
+def test_failed_upload_can_be_retried(database, tmp_path, monkeypatch):
+    job_id = _finished_job_with_upload(tmp_path)
+    _give_up(monkeypatch)
+    assert _claim_upload() is None
+
+    assert retry_uploads(job_id) == 1
+
+    upload = _claim_upload()
+    assert upload["job_id"] == job_id
+    assert upload["attempts"] == 1
+
+def test_failed_uploads_expire_after_the_retention(database, tmp_path, monkeypatch):
+    job_id = _finished_job_with_upload(tmp_path)
+    _give_up(monkeypatch)
+    assert expire_failed_uploads() == []
+
+    with transaction() as conn:
+        conn.execute("UPDATE upload SET updated_at = ?", (time.time() - storage_service.UPLOAD_FAILED_RETENTION - 1,))
+
+    assert expire_failed_uploads() == [job_id]
+    assert retry_uploads(job_id) == 0
@@ -0,0 +1,19 @@
+from services.text_cleaning import clean_pages
+
+BODY = [f"Body sentence number {n} about the topic at hand." for n in range(8)]
+
+def test_page_numbers_in_header_and_footer_are_dropped():
+    pages = [f"{n}\n" + "\n".join(BODY) + f"\nPage {n} of 3" for n in (1, 2, 3)]
+
+    text = clean_pages(pages)
+
+    assert "Page 1 of 3" not in text
+    assert not any(line.strip() in ("1", "2", "3") for line in text.splitlines())
+
+def test_numbers_and_roman_words_in_the_body_are_kept():
+    page = "\n".join(BODY[:4] + ["2001", "13", "CV", "MIX"] + BODY[4:])
+
+    text = clean_pages([page])
+
+    for line in ("2001", "13", "CV", "MIX"):
+        assert line in text.splitlines()
@@ -0,0 +1,27 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+from config import DATABASE_PATH
+
+def get_connection():
+    os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
+    # isolation_level=None: we manage transactions explicitly with BEGIN IMMEDIATE
+    conn = sqlite3.connect(DATABASE_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+@contextmanager
+def transaction():
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
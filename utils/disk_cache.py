@@ -0,0 +1,85 @@
+import hashlib
+import os
+import tempfile
+import time
+
+class DiskCache:
+    """Size-bounded LRU cache of byte values stored as files under `directory`.
+
+    Keys are hashed into file names, so any string works as a key. Reads
+    bump the file's atime and eviction removes the least recently used
+    files until the cache is back under `max_bytes`. With `ttl` (seconds),
+    entries older than that, by mtime, are misses. Safe to share between
+    processes: writes are atomic renames and a vanished file is a miss.
+    """
+
+    EVICT_EVERY = 32
+
+    def __init__(self, directory, max_bytes, ttl=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, key):
+        path = self._path(key)
+        now = time.time()
+        try:
+            st = os.stat(path)
+            if self.ttl is not None and now - st.st_mtime > self.ttl:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path, (now, st.st_mtime))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 1:
+            self.evict()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, st
+
+    def evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[1].st_atime)
+        total = sum(st.st_size for _, st in entries)
+        for path, st in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= st.st_size
@@ -0,0 +1,56 @@
+import re
+
+class TurnParser:
+    """Incrementally split streamed script text into (speaker, text) turns.
+
+    A turn starts at a line beginning with one of the host names followed by
+    a colon (markdown bold around the name is tolerated) and runs until the
+    next such line. feed() returns the turns completed so far; close()
+    returns the last one.
+    """
+
+    def __init__(self, hosts):
+        names = "|".join(re.escape(name) for name in hosts)
+        self._label_re = re.compile(rf"^\s*[*_]*\s*({names})\s*[*_]*\s*:\s*[*_]*\s*", re.IGNORECASE)
+        self._canonical = {name.lower(): name for name in hosts}
+        self._buffer = ""
+        self._speaker = None
+        self._lines = []
+
+    def _flush(self):
+        text = " ".join(line.strip() for line in self._lines if line.strip())
+        turn = (self._speaker, text) if self._speaker and text else None
+        self._speaker, self._lines = None, []
+        return turn
+
+    def _line(self, line):
+        match = self._label_re.match(line)
+        if match is None:
+            # Continuation of the current turn; text before the first label is dropped
+            if self._speaker:
+                self._lines.append(line)
+            return None
+        turn = self._flush()
+        self._speaker = self._canonical[match.group(1).lower()]
+        self._lines = [line[match.end():]]
+        return turn
+
+    def feed(self, text):
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        return [turn for turn in map(self._line, lines) if turn]
+
+    def close(self):
+        turns = []
+        if self._buffer:
+            turns.append(self._line(self._buffer))
+            self._buffer = ""
+        turns.append(self._flush())
+        return [turn for turn in turns if turn]
+
+def parse_turns(script, hosts):
+    parser = TurnParser(hosts)
+    return parser.feed(script) + parser.close()
+
+def format_turns(turns):
+    return "\n\n".join(f"{speaker}: {text}" for speaker, text in turns)
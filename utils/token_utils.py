@@ -0,0 +1,65 @@
+import logging
+import os
+import re
+
+from tokenizers import Tokenizer
+
+from config import TOKENIZER_PATH, TOKENIZER_NAME
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+_tokenizer = None
+_tokenizer_loaded = False
+
+def _get_tokenizer():
+    global _tokenizer, _tokenizer_loaded
+    if not _tokenizer_loaded:
+        _tokenizer_loaded = True
+        try:
+            if os.path.isfile(TOKENIZER_PATH):
+                _tokenizer = Tokenizer.from_file(TOKENIZER_PATH)
+            else:
+                _tokenizer = Tokenizer.from_pretrained(TOKENIZER_NAME)
+        except Exception:
+            logger.warning("could not load tokenizer %s, estimating token counts", TOKENIZER_NAME, exc_info=True)
+    return _tokenizer
+
+def count_tokens(text):
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        # Rough estimate for English prose: about 1.3 tokens per word
+        return int(len(text.split()) * 1.3)
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+def _pieces(text, max_tokens):
+    # Paragraphs, falling back to sentences and then words when one is too long
+    for paragraph in re.split(r"\n\s*\n", text):
+        if count_tokens(paragraph) <= max_tokens:
+            yield paragraph
+            continue
+        for sentence in SENTENCE_END_RE.split(paragraph):
+            if count_tokens(sentence) <= max_tokens:
+                yield sentence
+                continue
+            words = sentence.split()
+            step = max(1, int(len(words) * max_tokens / count_tokens(sentence)))
+            for i in range(0, len(words), step):
+                yield " ".join(words[i:i + step])
+
+def chunk_text(text, max_tokens):
+    """Split `text` into chunks of at most about `max_tokens` tokens on natural boundaries."""
+    chunks, current, used = [], [], 0
+    for piece in _pieces(text, max_tokens):
+        if not piece.strip():
+            continue
+        tokens = count_tokens(piece)
+        if current and used + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, used = [], 0
+        current.append(piece)
+        used += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
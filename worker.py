@@ -0,0 +1,85 @@
+# Entry point for the podcast job workers: python worker.py [--processes N]
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from config import JOB_POLL_INTERVAL, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, WORKER_PROCESSES
+from services.job_service import (
+    init_db, claim_job, complete_job, fail_job, requeue_job, renew_lease, LeaseLost,
+)
+from services.dedupe_service import init_db as init_dedupe_db
+from services.pipeline import run_job, finish_upload, fail_upload, cleanup_failed_uploads
+from services.storage_service import init_db as init_storage_db, start_uploader
+from services.llm_service import warm_up
+from services.stream_service import cleanup_streams
+
+logger = logging.getLogger("unipod.worker")
+
+def _keep_lease(job_id, worker_id, stop):
+    # A single stage (script and audio together) can outlast a lease, so renew it
+    # well before it expires for as long as the job runs
+    while not stop.wait(JOB_LEASE_SECONDS / 3):
+        if not renew_lease(job_id, worker_id):
+            logger.warning("job %s: lease lost to another worker", job_id)
+            return
+
+def work_forever():
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info("worker %s started", worker_id)
+    # Finished episodes upload in the background while this process takes the next job
+    start_uploader(finish_upload, fail_upload)
+    while True:
+        job = claim_job(worker_id)
+        if job is None:
+            cleanup_streams()
+            cleanup_failed_uploads()
+            time.sleep(JOB_POLL_INTERVAL)
+            continue
+        logger.info("job %s claimed (attempt %s)", job["id"], job["attempts"])
+        stop = threading.Event()
+        threading.Thread(target=_keep_lease, args=(job["id"], worker_id, stop), daemon=True).start()
+        try:
+            result = run_job(job)
+        except LeaseLost:
+            logger.warning("job %s: lease lost, abandoning this attempt", job["id"])
+            continue
+        except Exception as e:
+            logger.exception("job %s failed", job["id"])
+            if job["attempts"] < JOB_MAX_ATTEMPTS:
+                requeue_job(job["id"], str(e), worker_id)
+            else:
+                fail_job(job["id"], str(e), worker_id)
+            continue
+        finally:
+            stop.set()
+        if complete_job(job["id"], result, worker_id):
+            logger.info("job %s done", job["id"])
+        else:
+            logger.warning("job %s: lease lost, discarding this attempt's result", job["id"])
+
+def main():
+    parser = argparse.ArgumentParser(description="UniPod podcast job worker")
+    parser.add_argument("--processes", type=int, default=WORKER_PROCESSES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+    init_db()
+    init_dedupe_db()
+    init_storage_db()
+    warm_up()
+
+    if args.processes <= 1:
+        work_forever()
+        return
+    procs = [multiprocessing.Process(target=work_forever, name=f"worker-{i}") for i in range(args.processes)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+if __name__ == '__main__':
+    main()